@@ -1,110 +1,377 @@
 import argparse
+import shlex
 from weather_data_parser import WeatherDataParser
-from calculator import Calculator
+from calculator import AveragesAccumulator, Calculator, ExtremesAccumulator
 from report_generator import ReportGenerator
 
 
-class YearlyExtremesAction(argparse.Action):
-    ''' Generate yearly extremes report
+class ReportSession:
+    ''' Run every requested report against a single load of the data
+
+    Reports cover one station, or every station when none is given; the
+    station name is printed above each report when there are several.
+
     Attributes:
-        data_dir (str): The path to the data files
+        parser (WeatherDataParser): The parser shared by every report
+        calculator (Calculator): The calculator shared by every report
+        station (str): The station to report on, or None for every station
+        stream (bool): Whether reports stream the files instead of loading them
+        chart_format (str): The format charts are rendered in: "ansi", "html" or "svg"
+        failed (bool): Whether any report had no data
+    '''
+
+    def __init__(self, data_dir: str, jobs: int = 1, cache_path: str = None, stream: bool = False,
+                 station: str = None, chart_format: str = 'ansi', parser: WeatherDataParser = None):
+        ''' Initialize the session
 
+        Args:
+            data_dir (str): The path to the data files
+            jobs (int): The number of processes used to parse files
+            cache_path (str): Optional path of a snapshot of parsed files
+            stream (bool): Whether reports stream the files instead of loading them
+            station (str): The station to report on, or None for every station
+            chart_format (str): The format charts are rendered in: "ansi", "html" or "svg"
+            parser (WeatherDataParser): A parser whose loaded data the session
+                shares, instead of a new one reading data_dir
         '''
+        self.parser = parser or WeatherDataParser(data_dir, jobs=jobs, cache_path=cache_path)
+        self.calculator = Calculator(self.parser.weather_readings,
+                                     loader=self.parser.populate_data)
+        self.station = station
+        self.stream = stream
+        self.chart_format = chart_format
+        self.failed = False
 
-    def __call__(self, parser, namespace, values, option_string=None):
-        year = values
+    def run(self, queries: list):
+        ''' Run queued reports in order
+
+        Args:
+            queries (list): (report, values) pairs queued by the report actions
+        '''
+        for report, values in queries:
+            getattr(self, report)(values)
 
-        parser = WeatherDataParser(namespace.data_dir)
-        weather_data = parser.populate_data()
-        calculator = Calculator(weather_data)
-        calculations_results = calculator.find_extremes_for_year(year)
-        report = ReportGenerator(calculations_results)
-        print(report.generate_year_extremes_report())
+    def station_results(self, report: str, *args):
+        ''' Run a Calculator report for the selected station, or every station
+
+        Args:
+            report (str): The Calculator method generating the report
+            *args: The year, and the month for monthly reports, or the first
+                and last date of a date range
+        Returns:
+            dict: Station name to its result, or a message if there is no data
+        '''
+        if self.station is not None:
+            result = getattr(self.calculator, report)(*args, station=self.station)
+            return result if isinstance(result, str) else {self.station: result}
+        results = self.calculator.for_each_station(report, *args)
+        with_data = {station: result for station, result in results.items()
+                     if not isinstance(result, str)}
+        if with_data:
+            return with_data
+        return next(iter(results.values()), None) or getattr(self.calculator, report)(*args)
 
+    def stream_results(self, accumulator_class, *args):
+        ''' Stream the files of the selected station, or of every station
 
-class MonthlyAveragesAction(argparse.Action):
-    ''' Generate monthly averages report
-    Attributes:
-        data_dir (str): The path to the data files
+        Args:
+            accumulator_class (type): ExtremesAccumulator or AveragesAccumulator
+            *args: The year, and the month for monthly reports
+        Returns:
+            dict: Station name to its result, or a message if there is no data
         '''
+        stations = [self.station] if self.station is not None else self.parser.stations()
+        results = {}
+        for station in stations:
+            accumulator = accumulator_class(*args)
+            for batch in self.parser.stream_batches(*map(int, args), station=station):
+                accumulator.consume(batch)
+            results[station] = accumulator.result()
+        with_data = {station: result for station, result in results.items()
+                     if not isinstance(result, str)}
+        return with_data or accumulator_class(*args).result()
 
-    def __call__(self, parser, namespace, values, option_string=None):
+    def report_generators(self, station_results):
+        ''' Wrap each station's results in a ReportGenerator
+
+        Args:
+            station_results (dict): Station name to its CalculationResult, or
+                a message if there is no data
+        Yields:
+            ReportGenerator: The report generator of each station
+        '''
+        if isinstance(station_results, str):
+            print(station_results)
+            self.failed = True
+            return
+        for station, calculation_results in station_results.items():
+            if len(station_results) > 1:
+                print(station)
+            yield ReportGenerator(calculation_results)
+
+    def yearly_extremes(self, values: str):
+        ''' Generate yearly extremes report
+
+        Args:
+            values (str): The year
+        '''
+        year = values
+        if self.stream:
+            calculations_results = self.stream_results(ExtremesAccumulator, year)
+        else:
+            calculations_results = self.station_results('find_extremes_for_year', year)
+        for report in self.report_generators(calculations_results):
+            print(report.generate_year_extremes_report())
+
+    def monthly_averages(self, values: str):
         ''' Generate monthly averages report
 
         Args:
-            parser (argparse.ArgumentParser): The parser object
-            namespace (argparse.Namespace): The namespace object
-            values (str): The values for the month
-            option_string (str): The option string
+            values (str): The month in format YYYY/MM
+        '''
+        year, month = values.split("/")
+        year = int(year)
+        month = int(month)
+
+        if self.stream:
+            calculation_results = self.stream_results(AveragesAccumulator, year, month)
+        else:
+            calculation_results = self.station_results('calculate_month_averages', year, month)
+        for report in self.report_generators(calculation_results):
+            print(report.generate_month_avg_report())
+
+    def monthly_conditions(self, values: str):
+        ''' Generate monthly precipitation, wind, pressure and dew point report
+
+        Args:
+            values (str): The month in format YYYY/MM
         '''
         year, month = values.split("/")
         year = int(year)
         month = int(month)
 
-        parser = WeatherDataParser(namespace.data_dir)
-        weather_data = parser.populate_data()
-        calculator = Calculator(weather_data)
-        calculation_results = calculator.calculate_month_averages(year, month)
-        report = ReportGenerator(calculation_results)
-        print(report.generate_month_avg_report())
+        calculation_results = self.station_results('calculate_month_conditions', year, month)
+        for report in self.report_generators(calculation_results):
+            print(report.generate_month_conditions_report())
 
+    def rolling_statistics(self, values: str):
+        ''' Generate moving averages and anomalies report
 
-class BasicChartAction(argparse.Action):
-    ''' Generate basic barchart for daywise temperatures
+        Args:
+            values (str): The month in format YYYY/MM
+        '''
+        year, month = values.split("/")
+        year = int(year)
+        month = int(month)
 
-    Attributes:
-        data_dir (str): The path to the data files
+        calculation_results = self.station_results('calculate_rolling_statistics', year, month)
+        for report in self.report_generators(calculation_results):
+            print(report.generate_rolling_report())
 
-    '''
+    def monthly_departures(self, values: str):
+        ''' Generate daily departures from normal report
 
-    def __call__(self, parser, namespace, values, option_string=None):
+        Args:
+            values (str): The month in format YYYY/MM
+        '''
+        year, month = values.split("/")
+        year = int(year)
+        month = int(month)
+
+        calculation_results = self.station_results('calculate_departures', year, month)
+        for report in self.report_generators(calculation_results):
+            print(report.generate_departures_report())
+
+    def grouped_report(self, report: str):
+        ''' Print the table of a Calculator report covering every period
+
+        Args:
+            report (str): The Calculator method generating the report
+        '''
+        calculation_results = getattr(self.calculator, report)(station=self.station)
+        if isinstance(calculation_results, str):
+            print(calculation_results)
+            self.failed = True
+            return
+        print(ReportGenerator(calculation_results).generate_grouped_report(), end="")
+
+    def all_years(self, values: list):
+        ''' Generate extremes report of every year
+
+        Args:
+            values (list): Unused; the flag takes no value
+        '''
+        self.grouped_report('calculate_all_years')
+
+    def all_months(self, values: list):
+        ''' Generate averages report of every month
+
+        Args:
+            values (list): Unused; the flag takes no value
+        '''
+        self.grouped_report('calculate_all_months')
+
+    def basic_chart(self, values: str):
         ''' Generate basic barchart for daywise temperatures
 
         Args:
-            parser (argparse.ArgumentParser): The parser object
-            namespace (argparse.Namespace): The namespace object
-            values (str): The values for the month
-            option_string (str): The option string
+            values (str): The month in format YYYY/MM
+        '''
+        year, month = values.split("/")
+        year = int(year)
+        month = int(month)
+
+        calculation_results = self.station_results('populate_temp_extremes_for_month', year, month)
+        for report in self.report_generators(calculation_results):
+            report.print_month_extremes_bar_chart()
+
+    def net_chart(self, values: str):
+        ''' Generate net effect bar charts for each day
+
+        Args:
+            values (str): The month in format YYYY/MM
         '''
         year, month = values.split("/")
         year = int(year)
         month = int(month)
 
-        parser = WeatherDataParser(namespace.data_dir)
-        weather_data = parser.populate_data()
-        calculator = Calculator(weather_data)
-        calculation_results = calculator.populate_temp_extremes_for_month(
-            year, month)
-        report = ReportGenerator(calculation_results)
-        report.print_month_extremes_bar_chart()
+        calculation_results = self.station_results('populate_temp_extremes_for_month', year, month)
+        for report in self.report_generators(calculation_results):
+            if self.chart_format == 'ansi':
+                report.print_net_month_extremes_bar_chart()
+            else:
+                print(report.render_chart(self.chart_format, net=True), end="")
+
+    def year_chart(self, values: str):
+        ''' Generate net effect bar charts for each day of every month of a year
+
+        Args:
+            values (str): The year
+        '''
+        year = int(values)
 
+        calculation_results = self.station_results('populate_temp_extremes_for_year', year)
+        for report in self.report_generators(calculation_results):
+            print(report.render_chart(self.chart_format, net=True), end="")
 
-class NetChartAction(argparse.Action):
-    ''' Generate net effect bar charts for eachday
+    def date_range(self, values: tuple):
+        ''' Generate extremes and averages report for a date range
+
+        Args:
+            values (tuple): The first and last date, inclusive
+        '''
+        first, last = values
+
+        calculation_results = self.station_results('calculate_date_range', first, last)
+        for report in self.report_generators(calculation_results):
+            print(report.generate_date_range_report())
+
+
+class ReportAction(argparse.Action):
+    ''' Queue a report to run once every flag has been parsed
+
+    The flag can be repeated; every occurrence queues another report, and
+    all of them share one ReportSession and therefore one load of the data.
 
     Attributes:
-        data_dir (str): The path to the data files
+        report (str): The ReportSession method generating the report
     '''
+    report = None
 
     def __call__(self, parser, namespace, values, option_string=None):
-        '''
-        Generate net effect bar charts for each day
+        ''' Queue the report
 
         Args:
             parser (argparse.ArgumentParser): The parser object
             namespace (argparse.Namespace): The namespace object
-            values (str): The values for the month
+            values (str): The values for the report
             option_string (str): The option string
+        '''
+        queries = list(getattr(namespace, 'queries', None) or [])
+        queries.append((self.report, values))
+        setattr(namespace, 'queries', queries)
+
+
+class YearlyExtremesAction(ReportAction):
+    ''' Generate yearly extremes report '''
+    report = 'yearly_extremes'
+
+
+class MonthlyAveragesAction(ReportAction):
+    ''' Generate monthly averages report '''
+    report = 'monthly_averages'
+
+
+class MonthlyConditionsAction(ReportAction):
+    ''' Generate monthly precipitation, wind, pressure and dew point report '''
+    report = 'monthly_conditions'
 
+
+class RollingStatisticsAction(ReportAction):
+    ''' Generate moving averages and anomalies report '''
+    report = 'rolling_statistics'
+
+
+class MonthlyDeparturesAction(ReportAction):
+    ''' Generate daily departures from normal report '''
+    report = 'monthly_departures'
+
+
+class AllYearsAction(ReportAction):
+    ''' Generate extremes report of every year '''
+    report = 'all_years'
+
+
+class AllMonthsAction(ReportAction):
+    ''' Generate averages report of every month '''
+    report = 'all_months'
+
+
+class BasicChartAction(ReportAction):
+    ''' Generate basic barchart for daywise temperatures '''
+    report = 'basic_chart'
+
+
+class NetChartAction(ReportAction):
+    ''' Generate net effect bar charts for eachday '''
+    report = 'net_chart'
+
+
+class YearChartAction(ReportAction):
+    ''' Generate net effect bar charts for every month of a year '''
+    report = 'year_chart'
+
+
+class BatchAction(argparse.Action):
+    ''' Queue every report listed in a batch file
+
+    Each non-empty line of the file holds report flags, e.g. "-e 2005" or
+    "-a 2006/3"; lines starting with "#" are ignored.
+
+    Attributes:
+        report_parser (argparse.ArgumentParser): The parser for report flags
+    '''
+
+    def __init__(self, option_strings, dest, report_parser=None, **kwargs):
+        super().__init__(option_strings, dest, **kwargs)
+        self.report_parser = report_parser
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        ''' Queue the reports of the batch file
+
+        Args:
+            parser (argparse.ArgumentParser): The parser object
+            namespace (argparse.Namespace): The namespace object
+            values (str): The path of the batch file
+            option_string (str): The option string
         '''
-        year, month = values.split("/")
-        year = int(year)
-        month = int(month)
+        try:
+            with open(values, "r") as f:
+                lines = f.readlines()
+        except OSError as error:
+            parser.error(f"Cannot read batch file {values}: {error.strerror}")
 
-        parser = WeatherDataParser(namespace.data_dir)
-        weather_data = parser.populate_data()
-        calculator = Calculator(weather_data)
-        calculation_results = calculator.populate_temp_extremes_for_month(
-            year, month)
-        report = ReportGenerator(calculation_results)
-        report.print_net_month_extremes_bar_chart()
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                self.report_parser.parse_args(shlex.split(line), namespace)
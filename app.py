@@ -1,20 +1,145 @@
-from flask import Flask, request, render_template, redirect, url_for
-import json
+from flask import (Flask, abort, before_render_template, g, jsonify, make_response, request, render_template,
+                   redirect, template_rendered, url_for)
 import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from functools import partial, wraps
+from bulk_query import ALL_STATIONS, BulkQueryError, evaluate_queries, result_fields
 from calculator import Calculator
 from report_generator import ReportGenerator
 from weather_data_parser import WeatherDataParser
-from consts import DATA_DIR
+from consts import ANOMALY_THRESHOLD
+from data_reloader import DataReloader
+from profiling import profiler
+from response_cache import ResponseCache
+from user_store import UserStore
 from config import DevelopmentConfig
 
 app = Flask(__name__)
 
 app.config.from_object(DevelopmentConfig)
+# WEATHERMAN_<KEY> environment variables override the config, e.g.
+# WEATHERMAN_DATA_DIR=/srv/weather
+app.config.from_prefixed_env('WEATHERMAN')
 
-parser = WeatherDataParser(DATA_DIR)
+# enabled before loading so the startup ingest is profiled too
+profiler.enabled = app.config['PROFILE']
+
+parser = WeatherDataParser(app.config['DATA_DIR'], jobs=app.config['INGEST_JOBS'],
+                           cache_path=app.config['SNAPSHOT_PATH'])
 weather_data = parser.populate_data()
 calculator = Calculator(weather_data)
 
+# bumped on every reload so cached reports of older data are dropped
+dataset_version = 0
+dataset_loaded_at = datetime.now(timezone.utc)
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'])
+
+
+def swap_weather_data(weather_readings):
+    ''' Swap in a reloaded dataset; requests already running keep the old one '''
+    global weather_data, calculator, dataset_version, dataset_loaded_at
+    calculator = Calculator(weather_readings)
+    weather_data = weather_readings
+    dataset_loaded_at = datetime.now(timezone.utc)
+    dataset_version += 1
+
+
+def cached_report(view=None, mimetype=None):
+    ''' Serve a report route from the response cache, with ETag and Last-Modified
+
+    Clients revalidating with If-None-Match or If-Modified-Since get a 304
+    while the data is unchanged. Used bare, or as @cached_report(mimetype=...)
+    for routes that do not answer HTML.
+    '''
+    if view is None:
+        return partial(cached_report, mimetype=mimetype)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        version, loaded_at = dataset_version, dataset_loaded_at
+        key = response_cache.normalize_key(request.path, request.args.items(multi=True))
+        entry = response_cache.get(key, version)
+        if entry is None:
+            entry = response_cache.put(key, version, view(*args, **kwargs))
+
+        response = make_response(entry.body)
+        if mimetype is not None:
+            response.mimetype = mimetype
+        response.set_etag(entry.etag)
+        response.last_modified = loaded_at
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
+
+
+reloader = None
+reloader_lock = threading.Lock()
+
+
+@app.before_request
+def ensure_reloader():
+    ''' Start the reloader in the process serving the request
+
+    Threads do not survive a fork, so prefork servers sharing the preloaded
+    dataset (e.g. gunicorn --preload) start one reloader per worker here.
+    '''
+    global reloader
+    if not app.config['RELOAD_INTERVAL'] or (reloader and reloader.pid == os.getpid()):
+        return
+    with reloader_lock:
+        if reloader is None or reloader.pid != os.getpid():
+            reloader = DataReloader(parser, app.config['RELOAD_INTERVAL'], swap_weather_data, app.logger)
+            reloader.start()
+
+
+@app.before_request
+def start_request_timer():
+    ''' Note when the request started, for the per-route stage '''
+    if profiler.enabled:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request(response):
+    ''' Time the request as the web.<endpoint> stage '''
+    started = g.pop('request_started', None)
+    if started is not None:
+        profiler.observe(f"web.{request.endpoint}", time.perf_counter() - started)
+    return response
+
+
+def start_render_timer(sender, template, context, **extra):
+    ''' Note when a template started rendering '''
+    if profiler.enabled:
+        g.render_started = time.perf_counter()
+
+
+def observe_render(sender, template, context, **extra):
+    ''' Time the rendering of a template as the render.<template> stage '''
+    started = g.pop('render_started', None)
+    if started is not None:
+        profiler.observe(f"render.{template.name}", time.perf_counter() - started)
+
+
+before_render_template.connect(start_render_timer, app)
+template_rendered.connect(observe_render, app)
+
+
+def report_generator(calculation_results):
+    ''' Wrap calculation results in a ReportGenerator, answering 404 without data '''
+    if isinstance(calculation_results, str):
+        abort(404, calculation_results)
+    return ReportGenerator(calculation_results)
+
+
+def temp_extremes(year, month, station):
+    ''' Get the daily temperature extremes of a month, or of a whole year without a month '''
+    if month:
+        return calculator.populate_temp_extremes_for_month(int(year), int(month), station=station)
+    return calculator.populate_temp_extremes_for_year(int(year), station=station)
+
 
 @app.route('/', methods=['GET'])
 def help():
@@ -22,56 +147,148 @@ def help():
 
 
 @app.route('/yearly-extremes', methods=['GET'])
+@cached_report
 def yearly_extremes_query():
     year = request.args.get('year')
-    calculations_results = calculator.find_extremes_for_year(year)
-    report = ReportGenerator(calculations_results)
+    station = request.args.get('station')
+    calculations_results = calculator.find_extremes_for_year(year, station=station)
+    report = report_generator(calculations_results)
     return render_template("yearly_extremes.html", report=report.get_yearly_extremes_object())
 
 
 @app.route('/monthly-averages', methods=['GET'])
+@cached_report
 def monthly_averages_query():
     year = request.args.get('year')
     month = request.args.get('month')
-    print(year, month)
-    calculation_results = calculator.calculate_month_averages(year, int(month))
-    report = ReportGenerator(calculation_results)
+    station = request.args.get('station')
+    calculation_results = calculator.calculate_month_averages(year, int(month), station=station)
+    report = report_generator(calculation_results)
     return render_template("monthly_avg.html", report=report.get_month_avg_object())
 
 
 @app.route('/basic-chart', methods=['GET'])
+@cached_report
 def basic_chart_query():
     year = request.args.get('year')
     month = request.args.get('month')
+    station = request.args.get('station')
     calculation_results = calculator.populate_temp_extremes_for_month(
-        int(year), int(month))
-    report = ReportGenerator(calculation_results)
+        int(year), int(month), station=station)
+    report = report_generator(calculation_results)
     return render_template('basic_chart.html', data=report.get_month_extremes_data())
 
 
 @ app.route('/net-chart', methods=['GET'])
+@cached_report
 def net_chart_query():
     year = request.args.get('year')
     month = request.args.get('month')
-    calculation_results = calculator.populate_temp_extremes_for_month(
-        int(year), int(month))
-    report = ReportGenerator(calculation_results)
-    return report.print_net_month_extremes_bar_chart()
+    station = request.args.get('station')
+    calculation_results = temp_extremes(year, month, station)
+    report = report_generator(calculation_results)
+    return render_template('chart.html', chart=report.render_chart('html', net=True),
+                           title=f"{month}/{year}" if month else year)
 
 
-USERS_FILE = 'users.json'
+@app.route('/chart.svg', methods=['GET'])
+@cached_report(mimetype='image/svg+xml')
+def svg_chart_query():
+    year = request.args.get('year')
+    month = request.args.get('month')
+    station = request.args.get('station')
+    net = request.args.get('kind', 'net') == 'net'
+    calculation_results = temp_extremes(year, month, station)
+    report = report_generator(calculation_results)
+    return report.render_chart('svg', net=net)
+
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    ''' Expose the stage timings and counters to Prometheus '''
+    if not profiler.enabled:
+        abort(404, "Profiling is disabled; set PROFILE in the config.")
+    response = make_response(profiler.prometheus())
+    response.mimetype = 'text/plain; version=0.0.4'
+    return response
 
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, 'r') as file:
-            return json.load(file)
-    return []
 
+@app.route('/api/date-range', methods=['GET'])
+def date_range_query():
+    ''' Answer the extremes and averages between ?from= and ?to=, inclusive; ?station=all covers every station '''
+    try:
+        first = date.fromisoformat(request.args.get('from', ''))
+        last = date.fromisoformat(request.args.get('to', ''))
+    except ValueError:
+        return jsonify({'error': "from and to must be dates in format YYYY-MM-DD"}), 400
+    if first > last:
+        return jsonify({'error': "from must not be after to"}), 400
+    station = request.args.get('station')
+    if station == ALL_STATIONS:
+        results = calculator.for_each_station('calculate_date_range', first, last)
+        return jsonify({'station': station, 'stations': {
+            name: result_fields(result) for name, result in results.items()}})
+    fields = result_fields(calculator.calculate_date_range(first, last, station=station))
+    return jsonify({'station': station, **fields}), 404 if 'error' in fields else 200
 
-def save_users(users):
-    with open(USERS_FILE, 'w') as file:
-        json.dump(users, file, indent=4)
+
+@app.route('/api/rolling', methods=['GET'])
+def rolling_statistics_query():
+    ''' Answer the moving averages and anomalies of a month; ?station=all covers every station '''
+    try:
+        year = int(request.args.get('year', ''))
+        month = int(request.args.get('month', ''))
+        threshold = float(request.args.get('k', ANOMALY_THRESHOLD))
+    except ValueError:
+        return jsonify({'error': "year and month must be integers and k a number"}), 400
+    if not 1 <= month <= 12:
+        return jsonify({'error': "month must be between 1 and 12"}), 400
+    station = request.args.get('station')
+    if station == ALL_STATIONS:
+        results = calculator.for_each_station('calculate_rolling_statistics', year, month, threshold=threshold)
+        return jsonify({'station': station, 'stations': {
+            name: result_fields(result) for name, result in results.items()}})
+    fields = result_fields(calculator.calculate_rolling_statistics(year, month, station=station, threshold=threshold))
+    return jsonify({'station': station, **fields}), 404 if 'error' in fields else 200
+
+
+@app.route('/api/departures', methods=['GET'])
+def departures_query():
+    ''' Answer the daily departures of a month from normal; ?station=all covers every station '''
+    try:
+        year = int(request.args.get('year', ''))
+        month = int(request.args.get('month', ''))
+    except ValueError:
+        return jsonify({'error': "year and month must be integers"}), 400
+    if not 1 <= month <= 12:
+        return jsonify({'error': "month must be between 1 and 12"}), 400
+    station = request.args.get('station')
+    if station == ALL_STATIONS:
+        results = calculator.for_each_station('calculate_departures', year, month)
+        return jsonify({'station': station, 'stations': {
+            name: result_fields(result) for name, result in results.items()}})
+    fields = result_fields(calculator.calculate_departures(year, month, station=station))
+    return jsonify({'station': station, **fields}), 404 if 'error' in fields else 200
+
+
+@app.route('/api/reports', methods=['POST'])
+def bulk_reports_query():
+    ''' Answer a JSON list of report queries in a single request '''
+    payload = request.get_json(silent=True)
+    queries = payload.get('queries') if isinstance(payload, dict) else None
+    if isinstance(queries, list) and len(queries) > app.config['BULK_QUERY_LIMIT']:
+        return jsonify({'error': f"at most {app.config['BULK_QUERY_LIMIT']} queries per request"}), 400
+    try:
+        results = evaluate_queries(calculator, queries)
+    except BulkQueryError as error:
+        return jsonify({'error': str(error)}), 400
+    return jsonify({'results': results})
+
+
+USERS_FILE = 'users.json'
+
+# users.json is imported the first time the database is created
+user_store = UserStore(app.config['USERS_DB'], legacy_json_path=USERS_FILE)
 
 
 @app.route('/create', methods=['GET', 'POST'])
@@ -82,15 +299,7 @@ def create_user():
         email = request.form['email']
         age = request.form['age']
 
-        users = load_users()
-
-        users.append({
-            'name': name,
-            'email': email,
-            'age': age
-        })
-
-        save_users(users)
+        user_store.add_user(name, email, age)
 
         return redirect(url_for('create_user'))
     # if the request is GET, then the form should be rendered
@@ -99,8 +308,11 @@ def create_user():
 
 @app.route('/show_users', methods=['GET'])
 def show_users():
-    users = load_users()
-    return render_template('show_users.html', users=users)
+    per_page = app.config['USERS_PER_PAGE']
+    page_count = max(1, -(-user_store.count() // per_page))
+    page = min(max(request.args.get('page', 1, type=int), 1), page_count)
+    users = user_store.page(page, per_page)
+    return render_template('show_users.html', users=users, page=page, page_count=page_count)
 
 
 if __name__ == '__main__':
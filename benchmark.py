@@ -0,0 +1,370 @@
+import argparse
+import contextlib
+import gzip
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from calculator import Calculator
+from report_generator import ReportGenerator
+from synthetic_data import SyntheticWeatherGenerator, station_names
+from weather_data_parser import WeatherDataParser
+from weather_store import EXTRA_MEASURES, WeatherReadingStore
+
+
+class BenchmarkRunner:
+    ''' Time the stages of the weatherman over one dataset
+
+    Every case is run repeat times for its timings, then once more under
+    tracemalloc for its peak memory, so tracing never skews the timings.
+
+    Attributes:
+        data_dir (str): The folder holding the data files
+        repeat (int): The number of timed runs of each case
+        jobs (int): The number of processes used by the parallel ingest case
+        results (list): One dict per case that has been run
+    '''
+
+    def __init__(self, data_dir: str, repeat: int = 5, jobs: int = 1):
+        ''' Initialize the runner, loading the dataset once for the query cases
+
+        Args:
+            data_dir (str): The folder holding the data files
+            repeat (int): The number of timed runs of each case
+            jobs (int): The number of processes used by the parallel ingest case
+        '''
+        self.data_dir = data_dir
+        self.repeat = repeat
+        self.jobs = jobs
+        self.results = []
+        self.parser = WeatherDataParser(data_dir)
+        self.weather_readings = self.parser.populate_data()
+        self.calculator = Calculator(self.weather_readings)
+        self.rows = sum(len(store) for store in self.weather_readings.values())
+        self.months = sorted({(station, year, month)
+                              for station, store in self.weather_readings.items()
+                              for year, month in store.month_index})
+        self.years = sorted({(station, year) for station, year, _ in self.months})
+
+    def measure(self, name: str, function, items: int):
+        ''' Time one case and record its throughput and peak memory
+
+        Args:
+            name (str): The case name
+            function (callable): Runs the case once
+            items (int): The number of rows or calls one run handles
+        Returns:
+            dict: The result of the case
+        '''
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        best = min(timings)
+        result = {
+            'name': name,
+            'items': items,
+            'best_seconds': best,
+            'median_seconds': statistics.median(timings),
+            'items_per_second': items / best if best else None,
+            'peak_memory_bytes': peak_memory,
+        }
+        self.results.append(result)
+        print(f"{name:<40} {best * 1000:>10.2f} ms {result['items_per_second'] or 0:>14,.0f}/s "
+              f"{peak_memory / 1024:>12,.0f} KiB")
+        return result
+
+    def run_ingest(self):
+        ''' Time loading the whole dataset '''
+        self.measure('ingest', lambda: WeatherDataParser(self.data_dir).populate_data(), self.rows)
+        if self.jobs > 1:
+            self.measure(f'ingest_jobs_{self.jobs}',
+                         lambda: WeatherDataParser(self.data_dir, jobs=self.jobs).populate_data(), self.rows)
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, 'snapshot.pickle')
+            WeatherDataParser(self.data_dir, cache_path=cache_path).populate_data()
+            self.measure('ingest_snapshot',
+                         lambda: WeatherDataParser(self.data_dir, cache_path=cache_path).populate_data(),
+                         self.rows)
+
+        # parsing alone, from lines already in memory: the row-by-row
+        # parser streaming uses against the bulk parser loading uses
+        paths = [entry.path for entry in self.parser.select_files()]
+        files = [f.readlines() for _, f in self.parser.source.read_files(paths)]
+
+        def parse_row_by_row():
+            for lines in files:
+                partition = WeatherReadingStore()
+                for date_ordinal, values, raw_values in self.parser.parse_lines(lines, raw_measures=EXTRA_MEASURES):
+                    partition.append(date_ordinal, values, raw_values)
+        self.measure('parse_rows (row by row)', parse_row_by_row, self.rows)
+        self.measure('parse_rows (bulk)', lambda: [self.parser.parse_partition(lines) for lines in files], self.rows)
+
+        # the same files read straight out of compressed archives
+        if os.path.isdir(self.data_dir):
+            with tempfile.TemporaryDirectory() as archive_dir:
+                files = [file for file, _ in self.parser.source.list_files()]
+                for archive_format in ('zip', 'gztar'):
+                    archive = shutil.make_archive(os.path.join(archive_dir, 'data'), archive_format, self.data_dir)
+                    self.measure(f'ingest ({archive_format})',
+                                 lambda archive=archive: WeatherDataParser(archive).populate_data(), self.rows)
+                gzip_dir = os.path.join(archive_dir, 'gzip')
+                os.makedirs(gzip_dir)
+                for file in files:
+                    with open(os.path.join(self.data_dir, file), 'rb') as f_in:
+                        with gzip.open(os.path.join(gzip_dir, f"{file}.gz"), 'wb') as f_out:
+                            shutil.copyfileobj(f_in, f_out)
+                self.measure('ingest (gzip files)', lambda: WeatherDataParser(gzip_dir).populate_data(), self.rows)
+
+        def stream():
+            for _ in self.parser.stream_readings():
+                pass
+        self.measure('stream_readings', stream, self.rows)
+
+    def run_calculator(self):
+        ''' Time filter_readings and every Calculator report '''
+        calculator = self.calculator
+
+        def filter_readings():
+            for station, year, month in self.months:
+                calculator.filter_readings(self.weather_readings[station], year, month)
+        self.measure('filter_readings', filter_readings, len(self.months))
+
+        self.measure('find_extremes_for_year', lambda: [
+            calculator.find_extremes_for_year(year, station=station)
+            for station, year in self.years], len(self.years))
+        self.measure('calculate_month_averages', lambda: [
+            calculator.calculate_month_averages(year, month, station=station)
+            for station, year, month in self.months], len(self.months))
+        self.measure('calculate_month_conditions', lambda: [
+            calculator.calculate_month_conditions(year, month, station=station)
+            for station, year, month in self.months], len(self.months))
+        self.measure('calculate_rolling_statistics', lambda: [
+            calculator.calculate_rolling_statistics(year, month, station=station)
+            for station, year, month in self.months], len(self.months))
+        self.measure('calculate_departures', lambda: [
+            calculator.calculate_departures(year, month, station=station)
+            for station, year, month in self.months], len(self.months))
+        self.measure('populate_temp_extremes_for_month', lambda: [
+            calculator.populate_temp_extremes_for_month(year, month, station=station)
+            for station, year, month in self.months], len(self.months))
+
+        # windows of a year that do not line up with calendar years
+        self.measure('calculate_date_range', lambda: [
+            calculator.calculate_date_range(date(year, 3, 10), date(year, 3, 10) + timedelta(days=364),
+                                            station=station)
+            for station, year in self.years], len(self.years))
+
+        years = sorted({year for _, year in self.years})
+        self.measure('populate_temp_extremes_for_year', lambda: [
+            calculator.populate_temp_extremes_for_year(year, station=station)
+            for station, year in self.years], len(self.years))
+
+        # every year and every month at once against one call per period
+        self.measure('calculate_all_years', calculator.calculate_all_years, len(self.years))
+        self.measure('calculate_all_months', calculator.calculate_all_months, len(self.months))
+
+        self.measure('for_each_station', lambda: [
+            calculator.for_each_station('find_extremes_for_year', year) for year in years], len(years))
+
+    def run_reports(self):
+        ''' Time every ReportGenerator output '''
+        calculator = self.calculator
+        yearly = [ReportGenerator(calculator.find_extremes_for_year(year, station=station))
+                  for station, year in self.years]
+        monthly = [ReportGenerator(calculator.calculate_month_averages(year, month, station=station))
+                   for station, year, month in self.months]
+        conditions = [ReportGenerator(calculator.calculate_month_conditions(year, month, station=station))
+                      for station, year, month in self.months]
+        rolling = [ReportGenerator(calculator.calculate_rolling_statistics(year, month, station=station))
+                   for station, year, month in self.months]
+        departures = [ReportGenerator(calculator.calculate_departures(year, month, station=station))
+                      for station, year, month in self.months]
+        charts = [ReportGenerator(calculator.populate_temp_extremes_for_month(year, month, station=station))
+                  for station, year, month in self.months]
+        year_charts = [ReportGenerator(calculator.populate_temp_extremes_for_year(year, station=station))
+                       for station, year in self.years]
+        ranges = [ReportGenerator(calculator.calculate_date_range(
+            date(year, 3, 10), date(year, 3, 10) + timedelta(days=364), station=station))
+            for station, year in self.years]
+
+        def run_all(reports, method):
+            def run():
+                # the chart reports print as well as return their text
+                with contextlib.redirect_stdout(io.StringIO()):
+                    for report in reports:
+                        getattr(report, method)()
+            return run
+
+        grouped = [ReportGenerator(calculator.calculate_all_years()),
+                   ReportGenerator(calculator.calculate_all_months())]
+
+        for reports, method in (
+                (yearly, 'generate_year_extremes_report'),
+                (yearly, 'get_yearly_extremes_object'),
+                (monthly, 'generate_month_avg_report'),
+                (monthly, 'get_month_avg_object'),
+                (conditions, 'generate_month_conditions_report'),
+                (rolling, 'generate_rolling_report'),
+                (departures, 'generate_departures_report'),
+                (grouped, 'generate_grouped_report'),
+                (ranges, 'generate_date_range_report'),
+                (charts, 'get_month_extremes_data'),
+                (charts, 'print_month_extremes_bar_chart'),
+                (charts, 'print_net_month_extremes_bar_chart')):
+            self.measure(f'report.{method}', run_all(reports, method), len(reports))
+
+        # a whole year per call, in every chart format
+        for chart_format in ('ansi', 'html', 'svg'):
+            self.measure(f'report.render_chart ({chart_format}, year)', lambda chart_format=chart_format: [
+                report.render_chart(chart_format) for report in year_charts], len(year_charts))
+
+    def run_routes(self):
+        ''' Time the Flask routes through the test client, with and without the response cache '''
+        with tempfile.TemporaryDirectory() as users_dir:
+            # the app loads its data and users when imported, so it is
+            # pointed at the benchmark data and a throwaway users database
+            os.environ['WEATHERMAN_DATA_DIR'] = self.data_dir
+            os.environ['WEATHERMAN_USERS_DB'] = os.path.join(users_dir, 'users.db')
+            os.environ['WEATHERMAN_RELOAD_INTERVAL'] = '0'
+            import app as web
+            self.time_routes(web)
+
+    def time_routes(self, web):
+        ''' Time the routes of an app loaded with the benchmark data
+
+        Args:
+            web (module): The imported app module
+        '''
+        client = web.app.test_client()
+
+        station, year, month = self.months[len(self.months) // 2]
+        # route and whether it is served from the response cache
+        routes = [
+            (f'/yearly-extremes?year={year}&station={station}', True),
+            (f'/monthly-averages?year={year}&month={month}&station={station}', True),
+            (f'/basic-chart?year={year}&month={month}&station={station}', True),
+            (f'/net-chart?year={year}&month={month}&station={station}', True),
+            (f'/api/date-range?from={year}-03-10&to={year + 1}-03-09&station={station}', False),
+        ]
+        calls = 50
+        for route, cached in routes:
+            name = route.split('?')[0]
+
+            def cold(route=route):
+                for _ in range(calls):
+                    # a new dataset version empties the response cache
+                    web.dataset_version += 1
+                    client.get(route)
+
+            def warm(route=route):
+                for _ in range(calls):
+                    client.get(route)
+            self.measure(f'route{name}', cold, calls)
+            if cached:
+                self.measure(f'route{name} (cached)', warm, calls)
+
+        queries = [{'report': 'monthly_averages', 'year': year, 'month': month, 'station': station}
+                   for station, year, month in self.months]
+        self.measure('route/api/reports', lambda: client.post('/api/reports', json={'queries': queries}),
+                     len(queries))
+
+    def run(self):
+        ''' Run every case
+
+        Returns:
+            list: The result of each case
+        '''
+        print(f"{'case':<40} {'best':>13} {'throughput':>16} {'peak memory':>16}")
+        self.run_ingest()
+        self.run_calculator()
+        self.run_reports()
+        self.run_routes()
+        return self.results
+
+
+def compare(results: list, baseline_path: str):
+    ''' Print how each case changed against an earlier results file
+
+    Args:
+        results (list): The results of this run
+        baseline_path (str): The path of the earlier JSON results
+    '''
+    with open(baseline_path, "r") as f:
+        baseline = {result['name']: result for result in json.load(f)['results']}
+    print(f"\n{'case':<40} {'baseline':>13} {'now':>13} {'change':>8}")
+    for result in results:
+        before = baseline.get(result['name'])
+        if before is None or not before['best_seconds']:
+            continue
+        change = result['best_seconds'] / before['best_seconds']
+        print(f"{result['name']:<40} {before['best_seconds'] * 1000:>10.2f} ms "
+              f"{result['best_seconds'] * 1000:>10.2f} ms {change:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the weatherman on synthetic data")
+    parser.add_argument("--data-dir", type=str, default=None,
+                        help="Benchmark existing data files instead of generating them")
+    parser.add_argument("--stations", type=int, default=5, help="Number of synthetic stations")
+    parser.add_argument("--years", type=int, default=10, help="Number of synthetic years")
+    parser.add_argument("--missing-rate", type=float, default=0.05,
+                        help="Probability of a synthetic field being empty")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs of each case")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of processes of the parallel ingest case")
+    parser.add_argument("-o", "--output", type=str, default="benchmark_results.json",
+                        help="Path of the JSON results")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="JSON results of an earlier run to compare against")
+    args = parser.parse_args()
+
+    dataset = {'stations': args.stations, 'years': args.years,
+               'missing_rate': args.missing_rate, 'seed': args.seed}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = temp_dir
+            last_year = 2016
+            SyntheticWeatherGenerator(station_names(args.stations), last_year - args.years + 1, last_year,
+                                      missing_rate=args.missing_rate, seed=args.seed).write(data_dir)
+        else:
+            dataset = {'data_dir': data_dir}
+
+        runner = BenchmarkRunner(data_dir, repeat=args.repeat, jobs=args.jobs)
+        dataset['rows'] = runner.rows
+        dataset['files'] = len(runner.parser.select_files())
+        results = runner.run()
+
+    with open(args.output, "w") as f:
+        json.dump({
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'dataset': dataset,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import math
+from collections.abc import Mapping
+from datetime import date
+from calculator import Calculator
+
+# station value asking for a report of every station
+ALL_STATIONS = 'all'
+
+# report name to the Calculator method answering it and its parameters
+BULK_REPORTS = {
+    'yearly_extremes': ('find_extremes_for_year', ('year',)),
+    'monthly_averages': ('calculate_month_averages', ('year', 'month')),
+    'monthly_conditions': ('calculate_month_conditions', ('year', 'month')),
+    'rolling_statistics': ('calculate_rolling_statistics', ('year', 'month')),
+    'monthly_departures': ('calculate_departures', ('year', 'month')),
+    'chart': ('populate_temp_extremes_for_month', ('year', 'month')),
+    'all_years': ('calculate_all_years', ()),
+    'all_months': ('calculate_all_months', ()),
+}
+
+
+class BulkQueryError(ValueError):
+    ''' Raised for a malformed bulk query '''
+
+
+def parse_integer(value):
+    ''' Read an integer parameter of a query
+
+    Args:
+        value: The JSON value, an integer or the text of one
+    Returns:
+        int: The integer
+    Raises:
+        ValueError: If value is a number with a fraction, or not a number
+    '''
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def json_safe(value):
+    ''' Replace NaN, which JSON cannot represent, with None
+
+    Args:
+        value: A result field
+    Returns:
+        The value, with NaN replaced by None, dates in ISO format, named
+        tuples turned into dicts and other tuples into lists
+    '''
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Mapping):
+        return {key: json_safe(item) for key, item in value.items()}
+    if hasattr(value, '_asdict'):
+        return json_safe(value._asdict())
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+
+def evaluate_queries(calculator: Calculator, queries: list):
+    ''' Evaluate a list of report queries against one calculator
+
+    Every query is answered from the rollups or from the rows of a single
+    month, and a query repeated in the list is only evaluated once. A query
+    may name a "station"; "all" reports on every station in parallel.
+
+    Args:
+        calculator (Calculator): The calculator to query
+        queries (list): Dicts with a "report" name and its parameters, e.g.
+            {"report": "monthly_averages", "year": 2006, "month": 3}
+    Returns:
+        list: One dict per query, holding the result fields or an "error";
+            with "station": "all", a "stations" dict of those per station
+    Raises:
+        BulkQueryError: If a query is malformed
+    '''
+    if not isinstance(queries, list):
+        raise BulkQueryError("queries must be a list")
+
+    answers = {}
+    results = []
+    for position, query in enumerate(queries):
+        if not isinstance(query, dict) or query.get('report') not in BULK_REPORTS:
+            raise BulkQueryError(
+                f"query {position}: report must be one of {', '.join(BULK_REPORTS)}")
+        method, params = BULK_REPORTS[query['report']]
+        try:
+            args = tuple(parse_integer(query[param]) for param in params)
+        except (KeyError, ValueError, OverflowError):
+            raise BulkQueryError(
+                f"query {position}: {query['report']} needs integer {' and '.join(params)}")
+        if 'month' in params and not 1 <= args[-1] <= 12:
+            raise BulkQueryError(f"query {position}: month must be between 1 and 12")
+
+        station = query.get('station')
+        if station is not None and not isinstance(station, str):
+            raise BulkQueryError(f"query {position}: station must be a string")
+
+        key = (method, args, station)
+        if key not in answers:
+            if station == ALL_STATIONS:
+                answers[key] = calculator.for_each_station(method, *args)
+            else:
+                answers[key] = getattr(calculator, method)(*args, station=station)
+        result = answers[key]
+
+        if station == ALL_STATIONS:
+            results.append({'report': query['report'], 'station': station,
+                            'stations': {name: result_fields(station_result)
+                                         for name, station_result in result.items()}})
+        else:
+            results.append({'report': query['report'], 'station': station, **result_fields(result)})
+    return results
+
+
+def result_fields(result):
+    ''' Turn a calculation result into JSON-ready fields
+
+    Args:
+        result (CalculationResult): The result, or a message if there is no data
+    Returns:
+        dict: The result fields, or an "error"
+    '''
+    if isinstance(result, str):
+        return {'error': result}
+    return {field: json_safe(value) for field, value in result._asdict().items()}
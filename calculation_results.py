@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+
+class CalculationResult:
+    ''' Read interface shared by the immutable calculation results
+
+    Every query returns a fresh result, so results can be shared between
+    threads and processes without copying or locking.
+    '''
+    __slots__ = ()
+
+    def get_data(self, key: str):
+        ''' Get data from the result
+
+        Args:
+            key (str): The key
+        Returns:
+            The value, or None for an unknown key'''
+        return getattr(self, key, None)
+
+
+class YearlyExtremes(CalculationResult, namedtuple('YearlyExtremes', [
+    'year', 'max_temp', 'max_temp_date', 'min_temp', 'min_temp_date', 'max_humidity', 'max_humidity_date'
+])):
+    ''' Highest and lowest temperature and highest humidity of a year '''
+    __slots__ = ()
+
+
+class MonthlyAverages(CalculationResult, namedtuple('MonthlyAverages', [
+    'year', 'month', 'avg_highest_temp', 'avg_lowest_temp', 'avg_mean_humidity'
+])):
+    ''' Average highest and lowest temperature and mean humidity of a month '''
+    __slots__ = ()
+
+
+class MonthlyTempExtremes(CalculationResult, namedtuple('MonthlyTempExtremes', [
+    'year', 'month', 'max_temps', 'min_temps'
+])):
+    ''' Daily highest and lowest temperatures of a month '''
+    __slots__ = ()
+
+
+class DateRangeSummary(CalculationResult, namedtuple('DateRangeSummary', [
+    'first_date', 'last_date', 'days',
+    'max_temp', 'max_temp_date', 'min_temp', 'min_temp_date', 'max_humidity', 'max_humidity_date',
+    'avg_highest_temp', 'avg_lowest_temp', 'avg_mean_humidity'
+])):
+    ''' Extremes and averages over an arbitrary window of days '''
+    __slots__ = ()
+
+
+class MonthlyConditions(CalculationResult, namedtuple('MonthlyConditions', [
+    'year', 'month', 'total_precipitation', 'wet_days',
+    'max_wind_speed', 'max_wind_speed_date', 'max_gust_speed', 'max_gust_speed_date',
+    'avg_mean_pressure', 'min_pressure', 'min_pressure_date', 'avg_mean_dew_point'
+])):
+    ''' Precipitation, wind, pressure and dew point of a month '''
+    __slots__ = ()
+
+
+class YearlyTempExtremes(CalculationResult, namedtuple('YearlyTempExtremes', [
+    'year', 'months'
+])):
+    ''' Daily highest and lowest temperatures of every month of a year with data '''
+    __slots__ = ()
+
+
+class RollingStatistics(CalculationResult, namedtuple('RollingStatistics', [
+    'year', 'month', 'dates', 'averages', 'anomalies'
+])):
+    ''' Moving averages of each day of a month and the days flagged as anomalies
+
+    averages maps each window length in days to {measure: tuple of the
+    moving average on each of the dates}, both as read-only mappings.
+    '''
+    __slots__ = ()
+
+
+class MonthlyDepartures(CalculationResult, namedtuple('MonthlyDepartures', [
+    'year', 'month', 'dates', 'values', 'normals', 'departures', 'mean_departures', 'normal_years'
+])):
+    ''' Daily departures of a month from the normals of its days of the year
+
+    values, normals and departures map each measure to a tuple with an
+    entry per date: the reading, its Normal, and the reading less the normal
+    mean; mean_departures maps each measure to its average departure. All
+    four are read-only mappings. normal_years lists the years the normals
+    were taken over.
+    '''
+    __slots__ = ()
+
+
+class GroupedAggregates(CalculationResult, namedtuple('GroupedAggregates', [
+    'group_by', 'aggregates', 'rows'
+])):
+    ''' Aggregates of every group of readings, one row per group
+
+    Each row is a (key, values) pair: key holds the value of each group_by
+    key and values the result of each (measure, aggregate) pair.
+    '''
+    __slots__ = ()
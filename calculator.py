@@ -1,169 +1,626 @@
 import math
-from datetime import datetime
-from dict_data_item import DictDataItem
-from weather_data_parser import WeatherReading
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import MAXYEAR, MINYEAR, date, timedelta
+from types import MappingProxyType
+from calculation_results import (
+    DateRangeSummary, GroupedAggregates, MonthlyAverages, MonthlyConditions, MonthlyDepartures, MonthlyTempExtremes,
+    YearlyExtremes, RollingStatistics, YearlyTempExtremes)
+from climatology import Normal
+from consts import (
+    ALL_MONTHS_AGGREGATES, ALL_YEARS_AGGREGATES, ANOMALY_THRESHOLD, ANOMALY_WINDOW, DEPARTURE_MEASURES,
+    ROLLING_MEASURES, ROLLING_WINDOWS, STATION_WORKERS)
+from group_by import GroupByEngine
+from profiling import profiled, profiler
+from weather_store import WeatherReadingStore
+from window_stats import WindowStatistics
+
+# stands in for a station without any data
+EMPTY_STORE = WeatherReadingStore()
 
 
 class Calculator:
     ''' Class to calculate extremes, averages for a given year or month
+
+    Readings are held per station. Every query returns a new immutable
+    result and never writes to the calculator, so one calculator can serve
+    concurrent requests.
     '''
 
-    def __init__(self, weather_readings: WeatherReading):
+    def __init__(self, weather_readings: dict, loader=None):
         ''' Initialize the calculator with the weather readings
 
         Args:
-            weather_readings (list): The list of weather readings
+            weather_readings (dict): Station name to its WeatherReadingStore
+            loader (callable): Optional callable taking (year, month, station)
+                which loads the partitions a query touches and returns the
+                updated station mapping
 
         '''
         self.weather_readings = weather_readings
-        self.calculation_results = DictDataItem()
+        self.loader = loader
+        self.load_lock = threading.Lock()
 
-    def filter_readings(self, readings: WeatherReading, year=None, month=None):
-        ''' Filter readings based on year and month
+    def load_readings(self, year: int = None, month: int = None, station: str = None):
+        ''' Make sure the partitions of a year or month are loaded
+
+        Args:
+            year (int): The year, or None for every year
+            month (int): The month, or None for the whole year
+            station (str): The station, or None for every station
+        Returns:
+            dict: Station name to its WeatherReadingStore
+        '''
+        if self.loader is None:
+            return self.weather_readings
+        with self.load_lock:
+            self.weather_readings = self.loader(year, month, station)
+            return self.weather_readings
+
+    def load_period(self, *args):
+        ''' Load every station for the period a report covers
+
+        Args:
+            *args: The report arguments; the year and month, or the first
+                and last date of a date range
+        Returns:
+            dict: Station name to its WeatherReadingStore
+        '''
+        if args and isinstance(args[0], date):
+            first, last = args
+            # an empty range loads nothing; its reports say so per station
+            readings = self.weather_readings
+            for year in range(first.year, last.year + 1):
+                readings = self.load_readings(year)
+            return readings
+        return self.load_readings(*map(int, args))
+
+    def station_readings(self, year: int, month: int = None, station: str = None):
+        ''' Load and pick the readings of one station
+
+        Without a station, the only loaded station is used.
 
         Args:
-            readings (list): The list of readings
             year (int): The year
-            month (int): The month
+            month (int): The month, or None for the whole year
+            station (str): The station
+        Returns:
+            WeatherReadingStore: The readings of the station (empty for an
+                unknown station), or a message when the station is ambiguous
+        '''
+        readings = self.load_readings(year, month, station)
+        if station is not None:
+            return readings.get(station, EMPTY_STORE)
+        if len(readings) > 1:
+            return f"Data of several stations is loaded, choose one of: {', '.join(sorted(readings))}"
+        return next(iter(readings.values()), EMPTY_STORE)
+
+    @profiled('calculator')
+    def for_each_station(self, report: str, *args, **kwargs):
+        ''' Run a report for every station, in parallel across stations
+
+        Args:
+            report (str): The Calculator method generating the report
+            *args: The year, and the month for monthly reports
+            **kwargs: Further options of the report
         Returns:
-            list: The filtered list of readings
+            dict: Station name to its result, or to a message if it has no data
         '''
+        stations = sorted(self.load_period(*args))
+        if not stations:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(len(stations), STATION_WORKERS)) as executor:
+            results = executor.map(
+                lambda station: getattr(self, report)(*args, station=station, **kwargs), stations)
+            return dict(zip(stations, results))
 
-        def matches_criteria(reading: WeatherReading):
-            date_obj = datetime.strptime(reading.date, '%Y-%m-%d')
-            if year is not None and date_obj.year != year:
-                return False
-            if month is not None and date_obj.month != month:
-                return False
-            return True
+    @profiled('calculator')
+    def filter_readings(self, readings: WeatherReadingStore, year=None, month=None):
+        ''' Filter readings based on year and month
 
-        return [reading for reading in readings if matches_criteria(reading)]
+        Args:
+            readings (WeatherReadingStore): The columnar store of readings
+            year (int): The year
+            month (int): The month
+        Returns:
+            slice: The contiguous rows matching the year and month
+        '''
+        rows = slice(0, len(readings)) if year is None else readings.rows_for(year, month)
+        profiler.count('rows_filtered', rows.stop - rows.start)
+        return rows
 
-    def find_extremes_for_year(self, year: str):
+    @profiled('calculator')
+    def find_extremes_for_year(self, year: str, station: str = None):
         ''' Find the extremes for the given year
 
         Args:
             year (int): The year
+            station (str): The station, or None for the only station
         Returns:
-            DictDataItem: The calculation results
+            YearlyExtremes: The calculation results
         '''
-        # filter readings for the given year
-        filtered_readings = self.filter_readings(
-            self.weather_readings, year=int(year))
+        # answer from the yearly rollup instead of the daily rows
+        readings = self.station_readings(int(year), station=station)
+        if isinstance(readings, str):
+            return readings
+        summaries = readings.rollups.years.get(int(year))
 
-        if not filtered_readings:
+        if summaries is None:
             return "No data available for this year."
 
-        # find the max, min temperature reading and max humidity reading
-        max_temp_reading = None
-        min_temp_reading = None
-        max_humidity_reading = None
+        max_temp = summaries['max_temp']
+        min_temp = summaries['min_temp']
+        max_humidity = summaries['max_humidity']
 
-        for reading in filtered_readings:
-            if not math.isnan(reading.max_temp):
-                if max_temp_reading is None or reading.max_temp > max_temp_reading.max_temp:
-                    max_temp_reading = reading
-            if not math.isnan(reading.min_temp):
-                if min_temp_reading is None or reading.min_temp < min_temp_reading.min_temp:
-                    min_temp_reading = reading
-            if not math.isnan(reading.max_humidity):
-                if max_humidity_reading is None or reading.max_humidity > max_humidity_reading.max_humidity:
-                    max_humidity_reading = reading
-        self.calculation_results.add_data('year', year)
-        self.calculation_results.add_data(
-            'max_temp', max_temp_reading.max_temp)
-        self.calculation_results.add_data(
-            'max_temp_date', max_temp_reading.date)
-        self.calculation_results.add_data(
-            'min_temp', min_temp_reading.min_temp)
-        self.calculation_results.add_data(
-            'min_temp_date', min_temp_reading.date)
-        self.calculation_results.add_data(
-            'max_humidity', max_humidity_reading.max_humidity)
-        self.calculation_results.add_data(
-            'max_humidity_date', max_humidity_reading.date)
-
-        return self.calculation_results
-
-    def calculate_month_averages(self, year: str, month: str):
+        return YearlyExtremes(
+            year=year,
+            max_temp=max_temp.max,
+            max_temp_date=readings.ordinal_string(max_temp.max_date),
+            min_temp=min_temp.min,
+            min_temp_date=readings.ordinal_string(min_temp.min_date),
+            max_humidity=max_humidity.max,
+            max_humidity_date=readings.ordinal_string(max_humidity.max_date),
+        )
+
+    @profiled('calculator')
+    def calculate_month_averages(self, year: str, month: str, station: str = None):
         ''' Calculate the averages for the given month
 
         Args:
             year (int): The year
             month (int): The month
+            station (str): The station, or None for the only station
         Returns:
-            DictDataItem: The calculation results
+            MonthlyAverages: The calculation results
         '''
+        # answer from the monthly rollup instead of the daily rows
+        readings = self.station_readings(int(year), int(month), station)
+        if isinstance(readings, str):
+            return readings
+        summaries = readings.rollups.months.get((int(year), int(month)))
 
-        filtered_readings = self.filter_readings(
-            self.weather_readings, year=int(year), month=int(month))
-
-        if not filtered_readings:
+        if summaries is None:
             return "No data available for this year."
 
-        total_max_temp = 0
-        total_min_temp = 0
-        total_mean_humidity = 0
-        max_temp_count = 0
-        min_temp_count = 0
-        mean_humidity_count = 0
+        total_max_temp, max_temp_count = summaries['max_temp'][:2]
+        total_min_temp, min_temp_count = summaries['min_temp'][:2]
+        total_mean_humidity, mean_humidity_count = summaries['mean_humidity'][:2]
 
-        for reading in filtered_readings:
-            if not math.isnan(reading.max_temp):
-                total_max_temp += float(reading.max_temp)
-                max_temp_count += 1
-            if not math.isnan(reading.min_temp):
-                total_min_temp += float(reading.min_temp)
-                min_temp_count += 1
-            if not math.isnan(reading.mean_humidity):
-                total_mean_humidity += float(reading.mean_humidity)
-                mean_humidity_count += 1
-
-            average_max_temp = round(
-                total_max_temp / max_temp_count, 2) if max_temp_count > 0 else float('nan')
-            average_min_temp = round(
-                total_min_temp / min_temp_count, 2) if min_temp_count > 0 else float('nan')
-            average_mean_humidity = round(
-                total_mean_humidity / mean_humidity_count, 2) if mean_humidity_count > 0 else float('nan')
-
-            self.calculation_results.add_data('avg_lowest_temp',
-                                              average_min_temp)
-            self.calculation_results.add_data('avg_highest_temp',
-                                              average_max_temp)
-            self.calculation_results.add_data('avg_mean_humidity',
-                                              average_mean_humidity)
-            self.calculation_results.add_data('year', year)
-            self.calculation_results.add_data('month', month)
-        return self.calculation_results
-
-    def populate_temp_extremes_for_month(self, year: str, month: str):
+        average_max_temp = round(
+            total_max_temp / max_temp_count, 2) if max_temp_count > 0 else float('nan')
+        average_min_temp = round(
+            total_min_temp / min_temp_count, 2) if min_temp_count > 0 else float('nan')
+        average_mean_humidity = round(
+            total_mean_humidity / mean_humidity_count, 2) if mean_humidity_count > 0 else float('nan')
+
+        return MonthlyAverages(
+            year=year,
+            month=month,
+            avg_highest_temp=average_max_temp,
+            avg_lowest_temp=average_min_temp,
+            avg_mean_humidity=average_mean_humidity,
+        )
+
+    @profiled('calculator')
+    def calculate_grouped(self, group_by: tuple, aggregates: tuple, station: str = None):
+        ''' Aggregate every year and month of data, grouped by station, year and month
+
+        Every group comes out of one pass over the monthly rollups, so all
+        years or all months cost about as much as a single one.
+
+        Args:
+            group_by (tuple): The keys to group by, from GROUP_KEYS
+            aggregates (tuple): (measure, aggregate) pairs, from AGGREGATES
+            station (str): The station, or None for every station
+        Returns:
+            GroupedAggregates: The calculation results
+        '''
+        readings = self.load_readings(station=station)
+        if station is not None:
+            readings = {station: readings[station]} if station in readings else {}
+        rows = GroupByEngine(readings).group(group_by, aggregates)
+        if not rows:
+            return "No data available."
+
+        return GroupedAggregates(
+            group_by=tuple(group_by),
+            aggregates=tuple(aggregates),
+            rows=tuple(rows),
+        )
+
+    def calculate_all_years(self, station: str = None):
+        ''' Find the extremes of every year of every station
+
+        Args:
+            station (str): The station, or None for every station
+        Returns:
+            GroupedAggregates: The calculation results
+        '''
+        return self.calculate_grouped(('station', 'year'), ALL_YEARS_AGGREGATES, station=station)
+
+    def calculate_all_months(self, station: str = None):
+        ''' Calculate the averages of every month of every station
+
+        Args:
+            station (str): The station, or None for every station
+        Returns:
+            GroupedAggregates: The calculation results
+        '''
+        return self.calculate_grouped(('station', 'year', 'month'), ALL_MONTHS_AGGREGATES, station=station)
+
+    @profiled('calculator')
+    def calculate_date_range(self, first: date, last: date, station: str = None):
+        ''' Find the extremes and averages between two dates, inclusive
+
+        The rows are located by binary search and every aggregate is then
+        answered in constant time by the store's RangeQueryEngine.
+
+        Args:
+            first (date): The first date
+            last (date): The last date
+            station (str): The station, or None for the only station
+        Returns:
+            DateRangeSummary: The calculation results
+        '''
+        if first > last:
+            return "The first date must not be after the last date."
+        for year in range(first.year, last.year + 1):
+            readings = self.station_readings(year, station=station)
+            if isinstance(readings, str):
+                return readings
+
+        rows = readings.rows_between(first, last)
+        profiler.count('rows_filtered', rows.stop - rows.start)
+        if rows.start >= rows.stop:
+            return "No data available for this date range."
+
+        engine = readings.range_engine()
+        max_temp, max_temp_row = engine.extreme('max_temp', rows, largest=True)
+        min_temp, min_temp_row = engine.extreme('min_temp', rows, largest=False)
+        max_humidity, max_humidity_row = engine.extreme('max_humidity', rows, largest=True)
+
+        return DateRangeSummary(
+            first_date=first,
+            last_date=last,
+            days=rows.stop - rows.start,
+            max_temp=max_temp,
+            max_temp_date=None if max_temp_row is None else readings.date_string(max_temp_row),
+            min_temp=min_temp,
+            min_temp_date=None if min_temp_row is None else readings.date_string(min_temp_row),
+            max_humidity=max_humidity,
+            max_humidity_date=None if max_humidity_row is None else readings.date_string(max_humidity_row),
+            avg_highest_temp=round(engine.mean('max_temp', rows), 2),
+            avg_lowest_temp=round(engine.mean('min_temp', rows), 2),
+            avg_mean_humidity=round(engine.mean('mean_humidity', rows), 2),
+        )
+
+    @profiled('calculator')
+    def calculate_month_conditions(self, year: str, month: str, station: str = None):
+        ''' Summarize precipitation, wind, pressure and dew point for the given month
+
+        These measures are converted from their field text the first time a
+        query reads them, so loading the data never pays for them.
+
+        Args:
+            year (int): The year
+            month (int): The month
+            station (str): The station, or None for the only station
+        Returns:
+            MonthlyConditions: The calculation results
+        '''
+        readings = self.station_readings(int(year), int(month), station)
+        if isinstance(readings, str):
+            return readings
+        rows = self.filter_readings(readings, year=int(year), month=int(month))
+        if rows.start == rows.stop:
+            return "No data available for this year and month."
+
+        precipitation = readings.nan_values('precipitation', rows)
+        max_wind_speed, max_wind_speed_row = readings.nan_max('max_wind_speed', rows)
+        max_gust_speed, max_gust_speed_row = readings.nan_max('max_gust_speed', rows)
+        min_pressure, min_pressure_row = readings.nan_min('min_pressure', rows)
+        total_pressure, pressure_count = readings.nan_sum_count('mean_pressure', rows)
+        total_dew_point, dew_point_count = readings.nan_sum_count('mean_dew_point', rows)
+
+        return MonthlyConditions(
+            year=year,
+            month=month,
+            total_precipitation=round(math.fsum(precipitation), 2) if precipitation else float('nan'),
+            wet_days=sum(1 for value in precipitation if value > 0),
+            max_wind_speed=max_wind_speed,
+            max_wind_speed_date=None if max_wind_speed_row is None else readings.date_string(max_wind_speed_row),
+            max_gust_speed=max_gust_speed,
+            max_gust_speed_date=None if max_gust_speed_row is None else readings.date_string(max_gust_speed_row),
+            avg_mean_pressure=round(
+                total_pressure / pressure_count, 2) if pressure_count > 0 else float('nan'),
+            min_pressure=min_pressure,
+            min_pressure_date=None if min_pressure_row is None else readings.date_string(min_pressure_row),
+            avg_mean_dew_point=round(
+                total_dew_point / dew_point_count, 2) if dew_point_count > 0 else float('nan'),
+        )
+
+    @profiled('calculator')
+    def calculate_rolling_statistics(self, year: str, month: str, station: str = None,
+                                     threshold: float = ANOMALY_THRESHOLD):
+        ''' Calculate the moving averages and anomalies of each day of the given month
+
+        Windows reaching back before the month read the days before it, across
+        a year boundary too, so the first days of a month are not skewed.
+
+        Args:
+            year (int): The year
+            month (int): The month
+            station (str): The station, or None for the only station
+            threshold (float): The standard deviations from the trailing
+                window that make a day an anomaly
+        Returns:
+            RollingStatistics: The calculation results
+        '''
+        if not MINYEAR <= int(year) <= MAXYEAR:
+            return "No data available for this year and month."
+        # the windows of the first days reach back into the months before
+        first = date(int(year), int(month), 1).toordinal() - max(ROLLING_WINDOWS + (ANOMALY_WINDOW,))
+        day = date.fromordinal(max(first, 1))
+        while (day.year, day.month) < (int(year), int(month)):
+            self.load_readings(day.year, day.month, station)
+            day = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        readings = self.station_readings(int(year), int(month), station)
+        if isinstance(readings, str):
+            return readings
+        rows = self.filter_readings(readings, year=int(year), month=int(month))
+        if rows.start == rows.stop:
+            return "No data available for this year and month."
+
+        statistics = WindowStatistics(readings)
+        # read-only views, so the result stays safe to share
+        averages = MappingProxyType({
+            days: MappingProxyType({
+                measure: tuple(round(average, 2) for average in statistics.moving_averages(measure, rows, days))
+                for measure in ROLLING_MEASURES})
+            for days in ROLLING_WINDOWS
+        })
+        anomalies = sorted(
+            (anomaly for measure in ROLLING_MEASURES
+             for anomaly in statistics.anomalies(measure, rows, ANOMALY_WINDOW, float(threshold))),
+            key=lambda anomaly: tuple(map(int, anomaly.date.split('-'))))
+        return RollingStatistics(
+            year=year,
+            month=month,
+            dates=tuple(readings.date_string(row) for row in range(rows.start, rows.stop)),
+            averages=averages,
+            anomalies=tuple(anomalies),
+        )
+
+    @profiled('calculator')
+    def calculate_departures(self, year: str, month: str, station: str = None):
+        ''' Compare each day of the given month with the normals of its day of the year
+
+        The normals are taken over every year of the calendar month and are
+        cached in the store, so only the first report of a calendar month,
+        or the first after one of its files changes, scans its history.
+
+        Args:
+            year (int): The year
+            month (int): The month
+            station (str): The station, or None for the only station
+        Returns:
+            MonthlyDepartures: The calculation results
+        '''
+        # the normals of a month cover that month in every year
+        self.load_readings(None, int(month), station)
+        readings = self.station_readings(int(year), int(month), station)
+        if isinstance(readings, str):
+            return readings
+        rows = self.filter_readings(readings, year=int(year), month=int(month))
+        if rows.start == rows.stop:
+            return "No data available for this year and month."
+
+        normals = readings.normals(int(month))
+        days = [date.fromordinal(readings.dates[row]).day for row in range(rows.start, rows.stop)]
+        values, day_normals, departures, mean_departures = {}, {}, {}, {}
+        for measure in DEPARTURE_MEASURES:
+            values[measure] = tuple(readings.column(measure)[rows])
+            day_normals[measure] = tuple(
+                Normal(*(round(statistic, 2) for statistic in normals[day][measure][:4]), normals[day][measure].count)
+                for day in days)
+            departures[measure] = tuple(
+                round(value - normal.mean, 2) for value, normal in zip(values[measure], day_normals[measure]))
+            known = [departure for departure in departures[measure] if not math.isnan(departure)]
+            mean_departures[measure] = round(math.fsum(known) / len(known), 2) if known else float('nan')
+
+        return MonthlyDepartures(
+            year=year,
+            month=month,
+            dates=tuple(readings.date_string(row) for row in range(rows.start, rows.stop)),
+            values=MappingProxyType(values),
+            normals=MappingProxyType(day_normals),
+            departures=MappingProxyType(departures),
+            mean_departures=MappingProxyType(mean_departures),
+            normal_years=tuple(sorted(year for year, normal_month in readings.month_index
+                                      if normal_month == int(month))),
+        )
+
+    @profiled('calculator')
+    def populate_temp_extremes_for_month(self, year: str, month: str, station: str = None):
         ''' Populate the temperature extremes for the given month
 
         Args:
             year (int): The year
             month (int): The month
+            station (str): The station, or None for the only station
         Returns:
-            DictDataItem: The calculation results
+            MonthlyTempExtremes: The calculation results
 
             '''
 
         # filter readings for the given month
-        filtered_readings = self.filter_readings(
-            self.weather_readings, year=year, month=month)
-        if not filtered_readings:
+        readings = self.station_readings(int(year), int(month), station)
+        if isinstance(readings, str):
+            return readings
+        rows = self.filter_readings(readings, year=int(year), month=int(month))
+        if rows.start == rows.stop:
             return "No data available for this year and month."
 
-        if filtered_readings:
-            max_temps = []
-            min_temps = []
-            for reading in filtered_readings:
-                if not math.isnan(reading.max_temp):
-                    max_temps.append(reading.max_temp)
-                if not math.isnan(reading.min_temp):
-                    min_temps.append(reading.min_temp)
-            # add data to the calculation results
-            self.calculation_results.add_data('year', year)
-            self.calculation_results.add_data('month', month)
-            self.calculation_results.add_data('max_temps', max_temps)
-            self.calculation_results.add_data('min_temps', min_temps)
-            return self.calculation_results
+        return MonthlyTempExtremes(
+            year=year,
+            month=month,
+            max_temps=tuple(readings.nan_values('max_temp', rows)),
+            min_temps=tuple(readings.nan_values('min_temp', rows)),
+        )
+
+    @profiled('calculator')
+    def populate_temp_extremes_for_year(self, year: str, station: str = None):
+        ''' Populate the temperature extremes of every month of the given year
+
+        Args:
+            year (int): The year
+            station (str): The station, or None for the only station
+        Returns:
+            YearlyTempExtremes: The calculation results
+        '''
+        readings = self.station_readings(int(year), station=station)
+        if isinstance(readings, str):
+            return readings
+
+        months = []
+        for month in range(1, 13):
+            rows = self.filter_readings(readings, year=int(year), month=month)
+            if rows.start < rows.stop:
+                months.append(MonthlyTempExtremes(
+                    year=year,
+                    month=month,
+                    max_temps=tuple(readings.nan_values('max_temp', rows)),
+                    min_temps=tuple(readings.nan_values('min_temp', rows)),
+                ))
+        if not months:
+            return "No data available for this year."
+
+        return YearlyTempExtremes(year=year, months=tuple(months))
+
+
+class ExtremesAccumulator:
+    ''' Incrementally find the extremes for a year over a stream of readings
+
+    Attributes:
+        year (int): The year the readings belong to
+    '''
+
+    def __init__(self, year: str):
+        ''' Initialize the accumulator
+
+        Args:
+            year (int): The year
+        '''
+        self.year = year
+        self.count = 0
+        self.max_temp_reading = None
+        self.min_temp_reading = None
+        self.max_humidity_reading = None
+
+    def consume(self, readings):
+        ''' Fold a batch of readings into the extremes
+
+        Args:
+            readings (iterable): The WeatherReading objects
+        Returns:
+            ExtremesAccumulator: The accumulator itself
+        '''
+        for reading in readings:
+            self.count += 1
+            if not math.isnan(reading.max_temp):
+                if self.max_temp_reading is None or reading.max_temp > self.max_temp_reading.max_temp:
+                    self.max_temp_reading = reading
+            if not math.isnan(reading.min_temp):
+                if self.min_temp_reading is None or reading.min_temp < self.min_temp_reading.min_temp:
+                    self.min_temp_reading = reading
+            if not math.isnan(reading.max_humidity):
+                if self.max_humidity_reading is None or reading.max_humidity > self.max_humidity_reading.max_humidity:
+                    self.max_humidity_reading = reading
+        return self
+
+    def result(self):
+        ''' Build the calculation results from what has been consumed
+
+        Returns:
+            YearlyExtremes: The calculation results
+        '''
+        if not self.count:
+            return "No data available for this year."
+
+        return YearlyExtremes(
+            year=self.year,
+            max_temp=self.max_temp_reading.max_temp,
+            max_temp_date=self.max_temp_reading.date,
+            min_temp=self.min_temp_reading.min_temp,
+            min_temp_date=self.min_temp_reading.date,
+            max_humidity=self.max_humidity_reading.max_humidity,
+            max_humidity_date=self.max_humidity_reading.date,
+        )
+
+
+class AveragesAccumulator:
+    ''' Incrementally calculate the averages for a month over a stream of readings
+
+    Attributes:
+        year (int): The year the readings belong to
+        month (int): The month the readings belong to
+    '''
+
+    def __init__(self, year: str, month: str):
+        ''' Initialize the accumulator
+
+        Args:
+            year (int): The year
+            month (int): The month
+        '''
+        self.year = year
+        self.month = month
+        self.count = 0
+        self.totals = {'max_temp': 0.0, 'min_temp': 0.0, 'mean_humidity': 0.0}
+        self.counts = {'max_temp': 0, 'min_temp': 0, 'mean_humidity': 0}
+
+    def consume(self, readings):
+        ''' Fold a batch of readings into the running sums
+
+        Args:
+            readings (iterable): The WeatherReading objects
+        Returns:
+            AveragesAccumulator: The accumulator itself
+        '''
+        for reading in readings:
+            self.count += 1
+            for measure in self.totals:
+                value = getattr(reading, measure)
+                if not math.isnan(value):
+                    self.totals[measure] += value
+                    self.counts[measure] += 1
+        return self
+
+    def average(self, measure: str):
+        ''' Average of a measure over what has been consumed
+
+        Args:
+            measure (str): The measure name
+        Returns:
+            float: The average rounded to 2 places, or nan without values
+        '''
+        if not self.counts[measure]:
+            return float('nan')
+        return round(self.totals[measure] / self.counts[measure], 2)
+
+    def result(self):
+        ''' Build the calculation results from what has been consumed
+
+        Returns:
+            MonthlyAverages: The calculation results
+        '''
+        if not self.count:
+            return "No data available for this year."
+
+        return MonthlyAverages(
+            year=self.year,
+            month=self.month,
+            avg_highest_temp=self.average('max_temp'),
+            avg_lowest_temp=self.average('min_temp'),
+            avg_mean_humidity=self.average('mean_humidity'),
+        )
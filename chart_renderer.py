@@ -0,0 +1,227 @@
+import io
+from calendar import month_name
+from consts import BLUE_COLOR, CHART_BLUE_COLOR, CHART_RED_COLOR, RED_COLOR, RESET_COLOR
+
+
+class AnsiChartBackend:
+    ''' Draw charts as lines of colored "+" for the terminal '''
+
+    def begin(self, out, rows: int, low: float, high: float):
+        ''' Start the chart
+
+        Args:
+            out (io.StringIO): The output buffer
+            rows (int): The number of headings and bar rows that follow
+            low (float): The lowest temperature drawn, at most 0
+            high (float): The highest temperature drawn
+        '''
+
+    def heading(self, out, title: str):
+        ''' Draw the heading of a month
+
+        Args:
+            out (io.StringIO): The output buffer
+            title (str): The month and year
+        '''
+        out.write(f"{title}\n")
+
+    def bars(self, out, day: int, max_temp: float, min_temp: float):
+        ''' Draw the highest and lowest temperature of a day as two bars
+
+        Args:
+            out (io.StringIO): The output buffer
+            day (int): The day of the month
+            max_temp (float): The highest temperature
+            min_temp (float): The lowest temperature
+        '''
+        out.write(f"{day:02} {RED_COLOR}{'+' * int(max_temp)}{RESET_COLOR} {int(max_temp)}C\n"
+                  f"{day:02} {BLUE_COLOR}{'+' * int(min_temp)}{RESET_COLOR} {int(min_temp)}C\n")
+
+    def net_bar(self, out, day: int, max_temp: float, min_temp: float):
+        ''' Draw the lowest to highest temperature of a day as one bar
+
+        Args:
+            out (io.StringIO): The output buffer
+            day (int): The day of the month
+            max_temp (float): The highest temperature
+            min_temp (float): The lowest temperature
+        '''
+        out.write(f"{day:02} {BLUE_COLOR}{'+' * int(min_temp)}{RESET_COLOR}"
+                  f"{RED_COLOR}{'+' * int(max_temp - min_temp)}{RESET_COLOR}"
+                  f" {int(min_temp):02}C - {int(max_temp):02}C\n")
+
+    def end(self, out):
+        ''' Finish the chart
+
+        Args:
+            out (io.StringIO): The output buffer
+        '''
+
+
+class HtmlChartBackend(AnsiChartBackend):
+    ''' Draw charts as an HTML fragment of colored bars '''
+
+    # pixels per degree
+    scale = 4
+
+    def begin(self, out, rows: int, low: float, high: float):
+        self.low = low
+        out.write('<div class="chart font-mono text-sm">\n')
+
+    def heading(self, out, title: str):
+        out.write(f'<h2 class="text-xl font-bold mt-4 mb-2">{title}</h2>\n')
+
+    def bar(self, color: str, start: float, stop: float):
+        ''' Format a bar between two temperatures
+
+        Args:
+            color (str): The CSS color
+            start (float): The temperature the bar starts at
+            stop (float): The temperature the bar stops at
+        Returns:
+            str: The bar element
+        '''
+        width = max(0, int(stop) - int(start)) * self.scale
+        return f'<span style="display:inline-block;height:0.8em;width:{width}px;background:{color}"></span>'
+
+    def bars(self, out, day: int, max_temp: float, min_temp: float):
+        out.write(f'<div>{day:02} {self.bar(CHART_RED_COLOR, self.low, max_temp)} {int(max_temp)}C</div>\n'
+                  f'<div>{day:02} {self.bar(CHART_BLUE_COLOR, self.low, min_temp)} {int(min_temp)}C</div>\n')
+
+    def net_bar(self, out, day: int, max_temp: float, min_temp: float):
+        out.write(f'<div>{day:02} {self.bar(CHART_BLUE_COLOR, self.low, min_temp)}'
+                  f'{self.bar(CHART_RED_COLOR, min_temp, max_temp)}'
+                  f' {int(min_temp):02}C - {int(max_temp):02}C</div>\n')
+
+    def end(self, out):
+        out.write('</div>\n')
+
+
+class SvgChartBackend(AnsiChartBackend):
+    ''' Draw charts as a standalone SVG image '''
+
+    # pixels per degree, per row, and before the bars
+    scale = 6
+    row_height = 16
+    margin = 32
+
+    def begin(self, out, rows: int, low: float, high: float):
+        self.low = low
+        self.y = 0
+        height = rows * self.row_height + 8
+        width = self.x(high) + 120
+        out.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" '
+                  f'height="{height}" font-family="monospace" font-size="12">\n')
+
+    def x(self, temp: float):
+        ''' Place a temperature on the horizontal axis
+
+        Args:
+            temp (float): The temperature
+        Returns:
+            int: The x coordinate
+        '''
+        return self.margin + (int(temp) - int(self.low)) * self.scale
+
+    def text(self, out, x: int, label: str):
+        ''' Write a label on the current row
+
+        Args:
+            out (io.StringIO): The output buffer
+            x (int): The x coordinate of the label
+            label (str): The label
+        '''
+        out.write(f'<text x="{x}" y="{self.y + 12}">{label}</text>\n')
+
+    def rect(self, out, color: str, start: float, stop: float):
+        ''' Draw a bar between two temperatures on the current row
+
+        Args:
+            out (io.StringIO): The output buffer
+            color (str): The fill color
+            start (float): The temperature the bar starts at
+            stop (float): The temperature the bar stops at
+        '''
+        out.write(f'<rect x="{self.x(start)}" y="{self.y + 3}" width="{max(0, self.x(stop) - self.x(start))}" '
+                  f'height="{self.row_height - 4}" fill="{color}"/>\n')
+
+    def heading(self, out, title: str):
+        out.write(f'<text x="0" y="{self.y + 12}" font-weight="bold">{title}</text>\n')
+        self.y += self.row_height
+
+    def bars(self, out, day: int, max_temp: float, min_temp: float):
+        for color, temp in ((CHART_RED_COLOR, max_temp), (CHART_BLUE_COLOR, min_temp)):
+            self.text(out, 0, f"{day:02}")
+            self.rect(out, color, self.low, temp)
+            self.text(out, self.x(temp) + 4, f"{int(temp)}C")
+            self.y += self.row_height
+
+    def net_bar(self, out, day: int, max_temp: float, min_temp: float):
+        self.text(out, 0, f"{day:02}")
+        self.rect(out, CHART_BLUE_COLOR, self.low, min_temp)
+        self.rect(out, CHART_RED_COLOR, min_temp, max_temp)
+        self.text(out, self.x(max_temp) + 4, f"{int(min_temp):02}C - {int(max_temp):02}C")
+        self.y += self.row_height
+
+    def end(self, out):
+        out.write('</svg>\n')
+
+
+# chart format name to its backend
+CHART_BACKENDS = {
+    'ansi': AnsiChartBackend,
+    'html': HtmlChartBackend,
+    'svg': SvgChartBackend,
+}
+
+
+class ChartRenderer:
+    ''' Render the daily temperature charts of any number of months
+
+    Every month is drawn by one backend into one output buffer in a single
+    pass, so a year is rendered as cheaply as twelve months' bars.
+
+    Attributes:
+        backend (AnsiChartBackend): The backend drawing the chart
+        net (bool): Whether each day is one lowest-to-highest bar
+        headings (bool): Whether each month starts with its name and year
+    '''
+
+    def __init__(self, chart_format: str = 'ansi', net: bool = False, headings: bool = True):
+        ''' Initialize the renderer
+
+        Args:
+            chart_format (str): A CHART_BACKENDS name
+            net (bool): Whether each day is one lowest-to-highest bar
+            headings (bool): Whether each month starts with its name and year
+        '''
+        self.backend = CHART_BACKENDS[chart_format]()
+        self.net = net
+        self.headings = headings
+
+    def render(self, months):
+        ''' Render the charts of some months
+
+        Args:
+            months (iterable): The MonthlyTempExtremes of each month
+        Returns:
+            str: The rendered charts
+        '''
+        months = list(months)
+        days = [list(zip(month.max_temps, month.min_temps)) for month in months]
+        rows = sum(len(month_days) for month_days in days) * (1 if self.net else 2)
+        if self.headings:
+            rows += len(months)
+        low = min((min_temp for month_days in days for _, min_temp in month_days), default=0)
+        high = max((max_temp for month_days in days for max_temp, _ in month_days), default=0)
+
+        out = io.StringIO()
+        self.backend.begin(out, rows, min(low, 0), high)
+        for month, month_days in zip(months, days):
+            if self.headings:
+                self.backend.heading(out, f"{month_name[int(month.month)]} {month.year}")
+            draw = self.backend.net_bar if self.net else self.backend.bars
+            for day, (max_temp, min_temp) in enumerate(month_days, start=1):
+                draw(out, day, max_temp, min_temp)
+        self.backend.end(out)
+        return out.getvalue()
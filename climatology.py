@@ -0,0 +1,101 @@
+from collections import namedtuple
+from datetime import date
+from math import isnan, sqrt
+
+# the normal of one measure on one day of the year, across every year loaded
+Normal = namedtuple('Normal', ['mean', 'min', 'max', 'std', 'count'])
+
+EMPTY_NORMAL = Normal(float('nan'), float('nan'), float('nan'), float('nan'), 0)
+
+
+class ClimatologyTable:
+    ''' Day-of-year normals of every measure of one station
+
+    Normals are computed per calendar month, the first time a query needs
+    them, from that month's rows in every year. When a month file is added,
+    changed or removed only that calendar month is recomputed, on its next
+    query; every other month keeps its cached normals.
+
+    Attributes:
+        months (dict): Calendar month to {day: {measure: Normal}}
+    '''
+
+    def __init__(self, months=None):
+        ''' Initialize the table
+
+        Args:
+            months (dict): Normals already computed, to start from
+        '''
+        self.months = dict(months or {})
+
+    def invalidate(self, months):
+        ''' Drop the normals of the calendar months some changed months fall in
+
+        Args:
+            months (iterable): The (year, month) pairs whose rows changed
+        '''
+        for _, month in months:
+            self.months.pop(month, None)
+
+    def copy(self):
+        ''' Copy the table, sharing the computed normals
+
+        Returns:
+            ClimatologyTable: The new table
+        '''
+        return ClimatologyTable(self.months)
+
+    def normals_for(self, store, month: int, measures):
+        ''' Get the normals of every day of a calendar month
+
+        Args:
+            store (WeatherReadingStore): The indexed store of the station
+            month (int): The calendar month
+            measures (tuple): The measures to compute normals of
+        Returns:
+            dict: Day of the month to {measure: Normal}
+        '''
+        normals = self.months.get(month)
+        if normals is None:
+            normals = self.months[month] = self.compute(store, month, measures)
+        return normals
+
+    def compute(self, store, month: int, measures):
+        ''' Compute the normals of a calendar month from its rows in every year
+
+        Args:
+            store (WeatherReadingStore): The indexed store of the station
+            month (int): The calendar month
+            measures (tuple): The measures to compute normals of
+        Returns:
+            dict: Day of the month to {measure: Normal}
+        '''
+        # day to measure to (count, sum, sum of squares, min, max)
+        moments = {}
+        columns = {measure: store.column(measure) for measure in measures}
+        for (_, row_month), rows in store.month_index.items():
+            if row_month != month:
+                continue
+            for row in range(rows.start, rows.stop):
+                day = moments.setdefault(date.fromordinal(store.dates[row]).day, {})
+                for measure, column in columns.items():
+                    value = column[row]
+                    if isnan(value):
+                        continue
+                    count, total, squares, minimum, maximum = day.get(
+                        measure, (0, 0.0, 0.0, value, value))
+                    day[measure] = (count + 1, total + value, squares + value * value,
+                                    min(minimum, value), max(maximum, value))
+
+        normals = {}
+        for day, day_moments in moments.items():
+            normals[day] = {}
+            for measure in measures:
+                if measure not in day_moments:
+                    normals[day][measure] = EMPTY_NORMAL
+                    continue
+                count, total, squares, minimum, maximum = day_moments[measure]
+                mean = total / count
+                normals[day][measure] = Normal(mean, minimum, maximum,
+                                               sqrt(max(squares / count - mean * mean, 0.0)), count)
+        return normals
@@ -1,6 +1,10 @@
 import argparse
 from datetime import datetime
-from actions import NetChartAction, MonthlyAveragesAction, YearlyExtremesAction
+from actions import (
+    AllMonthsAction, AllYearsAction, BatchAction, NetChartAction, MonthlyAveragesAction, MonthlyConditionsAction,
+    MonthlyDeparturesAction, RollingStatisticsAction, YearChartAction, YearlyExtremesAction)
+from chart_renderer import CHART_BACKENDS
+from daemon import default_socket_path
 
 
 def create_parser():
@@ -36,14 +40,84 @@ def create_parser():
             raise argparse.ArgumentTypeError(
                 f"Invalid year/month format: {value}. Expected format: YYYY/MM")
 
-    parser = argparse.ArgumentParser(description="Weatherman")
+    def validate_date(value: str):
+        ''' Validate the date format
+        Args:
+            value (str): The date value
+        Returns:
+            date: The date
+        '''
+        try:
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"Invalid date format: {value}. Expected format: YYYY-MM-DD")
+
+    # report flags, also used to parse the lines of a batch file
+    report_parser = argparse.ArgumentParser(prog="batch file", add_help=False)
+    report_parser.add_argument("-e", "--year", type=validate_year,
+                               action=YearlyExtremesAction, help="Yearly extremes report (repeatable)")
+    report_parser.add_argument("-a", "--month", type=validate_year_month,  action=MonthlyAveragesAction,
+                               help="Month in format YYYY/MM for averages report (repeatable)")
+    report_parser.add_argument("-w", "--conditions", type=validate_year_month, action=MonthlyConditionsAction,
+                               help="Month in format YYYY/MM for precipitation, wind and pressure report (repeatable)")
+    report_parser.add_argument("-r", "--rolling", type=validate_year_month, action=RollingStatisticsAction,
+                               help="Month in format YYYY/MM for moving averages and anomalies (repeatable)")
+    report_parser.add_argument("-n", "--normals", type=validate_year_month, action=MonthlyDeparturesAction,
+                               help="Month in format YYYY/MM for daily departures from normal (repeatable)")
+    report_parser.add_argument("-c", "--chart", type=validate_year_month,
+                               action=NetChartAction, help="Month in format YYYY/MM for for barcharts (repeatable)")
+
+    report_parser.add_argument("--all-years", nargs=0, action=AllYearsAction,
+                               help="Table of the extremes of every year")
+    report_parser.add_argument("--all-months", nargs=0, action=AllMonthsAction,
+                               help="Table of the averages of every month")
+    report_parser.add_argument("-y", "--year-chart", type=validate_year, action=YearChartAction,
+                               help="Year in format YYYY for barcharts of every month (repeatable)")
+
+    parser = argparse.ArgumentParser(description="Weatherman", parents=[report_parser])
+    parser.add_argument("data_dir", type=str,
+                        help="Path to data files: a folder of plain or compressed files, or a zip or tar archive")
+    parser.add_argument("-s", "--station", type=str, default=None,
+                        help="Station to report on; every station when omitted")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream the data files instead of loading them")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes used to parse the data files")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Path of a snapshot of the parsed data files to reuse across runs")
+    parser.add_argument("--from", type=validate_date, dest="date_from", default=None, metavar="DATE",
+                        help="First day in format YYYY-MM-DD of a date range report; needs --to")
+    parser.add_argument("--to", type=validate_date, dest="date_to", default=None, metavar="DATE",
+                        help="Last day in format YYYY-MM-DD of a date range report; needs --from")
+    parser.add_argument("--chart-format", choices=sorted(CHART_BACKENDS), default="ansi",
+                        help="Format of the barcharts: ansi for the terminal, html or svg")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print the time spent in each stage and the rows read after the reports")
+    parser.add_argument("--batch", action=BatchAction, report_parser=report_parser,
+                        help="File with one set of report flags per line, run against the same data")
+    parser.add_argument("--socket", type=str, default=default_socket_path(),
+                        help="Socket of a running 'weatherman serve' daemon to send the reports to")
+    parser.add_argument("--no-daemon", action="store_true",
+                        help="Run the reports in this process even if a daemon is running")
+    parser.set_defaults(queries=[])
+    return parser
+
+
+def create_serve_parser():
+    ''' Create the parser of the serve command
+
+    Returns:
+        argparse.ArgumentParser: The parser object
+    '''
+    parser = argparse.ArgumentParser(prog="weatherman serve",
+                                     description="Keep the data loaded and answer reports over a Unix socket")
     parser.add_argument("data_dir", type=str,
-                        help="Path to data files")
-    parser.add_argument("-e", "--year", type=validate_year,
-                        action=YearlyExtremesAction, help="Yearly extremes report")
-    parser.add_argument("-a", "--month", type=validate_year_month,  action=MonthlyAveragesAction,
-                        help="Month in format YYYY/MM for averages report")
-    parser.add_argument("-c", "--chart",
-
-                        action=NetChartAction, help="Month in format YYYY/MM for for barcharts")
+                        help="Path to data files: a folder of plain or compressed files, or a zip or tar archive")
+    parser.add_argument("--socket", type=str, default=default_socket_path(),
+                        help="Path of the Unix socket to listen on")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes used to parse the data files")
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Path of a snapshot of the parsed data files to reuse across runs")
     return parser
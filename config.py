@@ -1,5 +1,26 @@
+import consts
+
+
 class Config:
     DEBUG = False
+    # folder or archive of the data files served
+    DATA_DIR = consts.DATA_DIR
+    # processes used to parse the data files at startup
+    INGEST_JOBS = 1
+    # snapshot of the parsed data files reused across restarts, None to disable
+    SNAPSHOT_PATH = None
+    # seconds between polls of DATA_DIR for new or changed files, 0 to disable
+    RELOAD_INTERVAL = 30
+    # rendered report responses kept in the LRU response cache
+    RESPONSE_CACHE_SIZE = 256
+    # largest number of queries accepted by the bulk JSON API
+    BULK_QUERY_LIMIT = 1000
+    # SQLite database holding the users
+    USERS_DB = 'users.db'
+    # users listed per page on /show_users
+    USERS_PER_PAGE = 50
+    # record per-stage timings and counters, served at /metrics
+    PROFILE = False
 
 
 class DevelopmentConfig(Config):
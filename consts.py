@@ -1,15 +1,51 @@
-# consts for indexes in WeatherReading tuple
+# index of the date field in each line of a data file
 DATE_INDEX = 0
-MAX_TEMP_INDEX = 1
-MEAN_TEMP_INDEX = 2
-MIN_TEMP_INDEX = 3
-MAX_HUMIDITY_INDEX = 4
-MEAN_HUMIDITY_INDEX = 5
-MIN_HUMIDITY_INDEX = 6
 
 # ansi color codes
 RED_COLOR = '\033[91m'
 BLUE_COLOR = '\033[94m'
 RESET_COLOR = '\033[0m'
 
+# colors of the HTML and SVG chart bars
+CHART_RED_COLOR = '#f87171'
+CHART_BLUE_COLOR = '#60a5fa'
+
 DATA_DIR = 'weatherfiles/'
+
+# data files are named <Station>_weather_<YYYY>_<Mon>.txt
+WEATHER_FILE_PATTERN = r'^(?P<station>.+)_weather_(?P<year>\d{4})_(?P<month>[A-Z][a-z]{2})\.txt$'
+
+# number of readings per batch when streaming
+STREAM_BATCH_SIZE = 1024
+
+# threads computing a report across stations
+STATION_WORKERS = 8
+
+# upper bounds in seconds of the profiling histogram buckets
+PROFILE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# window lengths in days of the rolling averages, and the measures averaged
+ROLLING_WINDOWS = (7, 30)
+ROLLING_MEASURES = ('max_temp', 'min_temp', 'mean_humidity')
+
+# a day is an anomaly when it is more than ANOMALY_THRESHOLD standard
+# deviations from the ANOMALY_WINDOW days before it
+ANOMALY_WINDOW = 30
+ANOMALY_THRESHOLD = 2.5
+
+# measures compared against their day-of-year normals
+DEPARTURE_MEASURES = ('max_temp', 'mean_temp', 'min_temp', 'mean_humidity')
+
+# name of the Unix socket the report daemon listens on unless --socket says
+# otherwise, kept in the user's runtime folder or home folder
+DAEMON_SOCKET_NAME = 'weatherman.sock'
+
+# seconds between checks of the daemon's data files for new or changed files
+DAEMON_RELOAD_INTERVAL = 5
+
+# seconds a report client waits on the daemon before running the reports itself
+DAEMON_TIMEOUT = 60
+
+# (measure, aggregate) columns of the --all-years and --all-months tables
+ALL_YEARS_AGGREGATES = (('max_temp', 'max'), ('min_temp', 'min'), ('max_humidity', 'max'))
+ALL_MONTHS_AGGREGATES = (('max_temp', 'mean'), ('min_temp', 'mean'), ('mean_humidity', 'mean'), ('max_temp', 'count'))
@@ -0,0 +1,205 @@
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+import time
+from datetime import date
+from actions import ReportSession
+from consts import DAEMON_RELOAD_INTERVAL, DAEMON_SOCKET_NAME, DAEMON_TIMEOUT
+from weather_data_parser import WeatherDataParser
+
+
+def default_socket_path():
+    ''' Pick the socket path of the current user's daemon
+
+    Returns:
+        str: DAEMON_SOCKET_NAME in $XDG_RUNTIME_DIR, or hidden in the home
+            folder when that is not set
+    '''
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, DAEMON_SOCKET_NAME)
+    return os.path.join(os.path.expanduser('~'), f".{DAEMON_SOCKET_NAME}")
+
+
+def encode_queries(queries: list):
+    ''' Turn queued reports into JSON values
+
+    Args:
+        queries (list): (report, values) pairs queued by the report actions
+    Returns:
+        list: [report, values] pairs, with dates in ISO format
+    '''
+    return [[report, [day.isoformat() for day in values] if isinstance(values, tuple) else values]
+            for report, values in queries]
+
+
+def decode_queries(queries: list):
+    ''' Turn JSON values back into queued reports
+
+    Args:
+        queries (list): [report, values] pairs made by encode_queries
+    Returns:
+        list: (report, values) pairs for ReportSession.run
+    '''
+    return [(report, tuple(map(date.fromisoformat, values)) if isinstance(values, list) else values)
+            for report, values in queries]
+
+
+class ReportDaemon(socketserver.UnixStreamServer):
+    ''' Answer report queries over a Unix socket from data kept in memory
+
+    Every file is loaded once at startup and then checked for changes at
+    most every DAEMON_RELOAD_INTERVAL seconds, so a query only pays for its
+    reports. Queries are answered one at a time, as the reports print to
+    the stdout captured for each.
+
+    Attributes:
+        data_dir (str): The real path of the data files served
+        parser (WeatherDataParser): The parser holding the loaded data
+        refreshed (float): The monotonic time the data was last checked
+    '''
+
+    def __init__(self, socket_path: str, data_dir: str, jobs: int = 1, cache_path: str = None):
+        ''' Load the data and listen on the socket
+
+        Args:
+            socket_path (str): The path of the Unix socket
+            data_dir (str): The path to the data files
+            jobs (int): The number of processes used to parse files
+            cache_path (str): Optional path of a snapshot of parsed files
+        '''
+        self.data_dir = os.path.realpath(data_dir)
+        self.parser = WeatherDataParser(data_dir, jobs=jobs, cache_path=cache_path)
+        self.parser.populate_data()
+        self.refreshed = time.monotonic()
+        super().__init__(socket_path, ReportRequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def refresh(self):
+        ''' Pick up changed data files if they were not checked lately '''
+        if time.monotonic() - self.refreshed >= DAEMON_RELOAD_INTERVAL:
+            self.parser.refresh()
+            self.refreshed = time.monotonic()
+
+    def answer(self, request: dict):
+        ''' Run the reports of one request
+
+        Args:
+            request (dict): The data_dir, station, chart_format and queries
+        Returns:
+            dict: The printed output and whether any report failed, or an
+                error when the request is for other data
+        '''
+        if os.path.realpath(request.get('data_dir', '')) != self.data_dir:
+            return {'error': f"This daemon serves {self.data_dir}"}
+        self.refresh()
+        session = ReportSession(self.data_dir, station=request.get('station'),
+                                chart_format=request.get('chart_format', 'ansi'), parser=self.parser)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                session.run(decode_queries(request.get('queries', [])))
+            except SystemExit:
+                session.failed = True
+        return {'output': output.getvalue(), 'failed': session.failed}
+
+
+class ReportRequestHandler(socketserver.StreamRequestHandler):
+    ''' Read one JSON request line and write one JSON response line '''
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # a connection only checking that the daemon is up
+            return
+        try:
+            request = json.loads(line)
+        except ValueError:
+            response = {'error': "Malformed request"}
+        else:
+            response = self.server.answer(request)
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+def request_reports(socket_path: str, data_dir: str, queries: list, station: str = None,
+                    chart_format: str = 'ansi'):
+    ''' Ask a running daemon to run reports
+
+    Args:
+        socket_path (str): The path of the daemon's Unix socket
+        data_dir (str): The path to the data files
+        queries (list): (report, values) pairs queued by the report actions
+        station (str): The station to report on, or None for every station
+        chart_format (str): The format charts are rendered in
+    Returns:
+        dict: The printed output and whether any report failed, or None if
+            no daemon of the current user serving data_dir answered
+    '''
+    try:
+        status = os.lstat(socket_path)
+    except OSError:
+        return None
+    if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+        # a socket another user made could answer with anything
+        return None
+
+    request = {
+        'data_dir': os.path.realpath(data_dir),
+        'station': station,
+        'chart_format': chart_format,
+        'queries': encode_queries(queries),
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(DAEMON_TIMEOUT)
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode() + b'\n')
+            with client.makefile('rb') as f:
+                line = f.readline()
+    except OSError:
+        return None
+    try:
+        response = json.loads(line)
+    except ValueError:
+        return None
+    if 'error' in response:
+        return None
+    return response
+
+
+def serve(socket_path: str, data_dir: str, jobs: int = 1, cache_path: str = None):
+    ''' Run the report daemon until it is interrupted or terminated
+
+    Args:
+        socket_path (str): The path of the Unix socket
+        data_dir (str): The path to the data files
+        jobs (int): The number of processes used to parse files
+        cache_path (str): Optional path of a snapshot of parsed files
+    '''
+    if os.path.exists(socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                # left behind by a daemon that did not shut down cleanly
+                os.unlink(socket_path)
+            else:
+                sys.exit(f"A daemon is already listening on {socket_path}")
+
+    # terminating runs the cleanup below, like an interrupt
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    daemon = ReportDaemon(socket_path, data_dir, jobs=jobs, cache_path=cache_path)
+    try:
+        print(f"Serving {daemon.data_dir} on {socket_path}", file=sys.stderr)
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+        os.unlink(socket_path)
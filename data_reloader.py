@@ -0,0 +1,56 @@
+import logging
+import os
+import threading
+from weather_data_parser import WeatherDataParser
+
+
+class DataReloader(threading.Thread):
+    ''' Background thread polling the data folder for new or changed files
+
+    Every poll only parses the files that were added or modified. When
+    anything changed, the freshly built stores are handed to on_reload, which
+    swaps them in; requests already running keep the stores they started with.
+
+    Attributes:
+        parser (WeatherDataParser): The parser that loaded the dataset
+        interval (float): Seconds between polls
+        on_reload (callable): Called with the new dict of station name to
+            WeatherReadingStore
+        logger (logging.Logger): The logger failed polls are reported to
+        pid (int): The process the thread was started in
+    '''
+
+    def __init__(self, parser: WeatherDataParser, interval: float, on_reload, logger: logging.Logger):
+        ''' Initialize the reloader
+
+        Args:
+            parser (WeatherDataParser): The parser that loaded the dataset
+            interval (float): Seconds between polls
+            on_reload (callable): Called with the new dict of station name
+                to WeatherReadingStore
+            logger (logging.Logger): The logger failed polls are reported to
+        '''
+        super().__init__(name='data-reloader', daemon=True)
+        self.parser = parser
+        self.interval = interval
+        self.on_reload = on_reload
+        self.logger = logger
+        self.stopped = threading.Event()
+        self.pid = os.getpid()
+
+    def run(self):
+        ''' Poll until stopped '''
+        while not self.stopped.wait(self.interval):
+            try:
+                if self.parser.refresh():
+                    self.on_reload(self.parser.weather_readings)
+            except (OSError, ValueError, IndexError) as error:
+                # a file caught half-written is picked up on the next poll
+                self.logger.warning("Reloading weather data failed: %s", error)
+            except Exception:
+                # keep polling; the data stays as it was before this poll
+                self.logger.exception("Reloading weather data failed")
+
+    def stop(self):
+        ''' Ask the thread to stop after the current poll '''
+        self.stopped.set()
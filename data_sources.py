@@ -0,0 +1,254 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import zipfile
+
+# file name suffix of a compressed data file to the function opening it
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+
+def split_compression(name: str):
+    ''' Strip the compression suffix off a file name
+
+    Args:
+        name (str): The file name, e.g. "Lahore_weather_2005_Jan.txt.gz"
+    Returns:
+        tuple: The name of the data file inside, and the function opening
+            it, or None when it is not compressed
+    '''
+    root, suffix = os.path.splitext(name)
+    opener = COMPRESSED_OPENERS.get(suffix)
+    if opener is None:
+        return name, None
+    return root, opener
+
+
+def text_stream(raw, name: str):
+    ''' Decode a binary stream as text, decompressing it on the fly
+
+    Args:
+        raw (io.BufferedIOBase): The binary stream
+        name (str): The file name the stream was read from
+    Returns:
+        io.TextIOBase: The text of the data file
+    '''
+    _, opener = split_compression(name)
+    if opener is not None:
+        return opener(raw, 'rt')
+    return io.TextIOWrapper(raw)
+
+
+class DirectorySource:
+    ''' Data files in a folder, each either plain or compressed on its own
+
+    Attributes:
+        folder_path (str): The folder holding the data files
+        sequential (bool): Whether files can only be read in one forward pass
+    '''
+
+    sequential = False
+
+    def __init__(self, folder_path: str):
+        ''' Initialize the source
+
+        Args:
+            folder_path (str): The folder holding the data files
+        '''
+        self.folder_path = folder_path
+
+    def list_files(self):
+        ''' List the data files
+
+        Returns:
+            list: The (name, path) of each file, where name has any
+                compression suffix stripped
+        '''
+        return [(split_compression(file)[0], os.path.join(self.folder_path, file))
+                for file in os.listdir(self.folder_path)]
+
+    def stat(self, path: str):
+        ''' Identify the version of a data file
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            tuple: The size and modification time in nanoseconds
+        '''
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def open(self, path: str):
+        ''' Open a data file as text
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            io.TextIOBase: The text of the file, decompressed as it is read
+        '''
+        _, opener = split_compression(path)
+        if opener is not None:
+            return opener(path, 'rt')
+        return open(path, 'r')
+
+    def read_files(self, paths: list):
+        ''' Open data files one after the other
+
+        Args:
+            paths (list): The paths of the data files
+        Yields:
+            tuple: The path and the text of each file, in the order of
+                paths; a file is closed once the next one is asked for
+        '''
+        for path in paths:
+            with self.open(path) as f:
+                yield path, f
+
+
+class ZipSource(DirectorySource):
+    ''' Data files stored as the members of a zip archive
+
+    Members are decompressed straight from the archive as they are read.
+    The archive is opened again whenever it changes on disk.
+
+    Attributes:
+        folder_path (str): The path of the archive; the path of a member is
+            the archive path joined with the member name
+    '''
+
+    def __init__(self, folder_path: str):
+        super().__init__(folder_path)
+        self.archive = None
+        self.archive_stat = None
+        self.members = {}
+
+    def zip_file(self):
+        ''' Get the open archive, reopening it if it changed on disk
+
+        Returns:
+            zipfile.ZipFile: The archive
+        '''
+        stat = super().stat(self.folder_path)
+        if self.archive is None or stat != self.archive_stat:
+            if self.archive is not None:
+                self.archive.close()
+            self.archive = zipfile.ZipFile(self.folder_path)
+            self.archive_stat = stat
+            self.members = {os.path.join(self.folder_path, info.filename): info
+                            for info in self.archive.infolist() if not info.is_dir()}
+        return self.archive
+
+    def list_files(self):
+        self.zip_file()
+        return [(split_compression(os.path.basename(path))[0], path) for path in self.members]
+
+    def stat(self, path: str):
+        ''' Identify the version of a member
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            tuple: The size and CRC of the member
+        '''
+        self.zip_file()
+        return self.members[path].file_size, self.members[path].CRC
+
+    def open(self, path: str):
+        archive = self.zip_file()
+        info = self.members[path]
+        return text_stream(archive.open(info), info.filename)
+
+
+class TarSource(DirectorySource):
+    ''' Data files stored as the members of a tar archive, compressed or not
+
+    A compressed tar has no index, so listing it reads it once and files
+    are then read in one forward pass over the archive rather than opened
+    one by one. The listing is kept until the archive changes on disk.
+
+    Attributes:
+        folder_path (str): The path of the archive; the path of a member is
+            the archive path joined with the member name
+    '''
+
+    sequential = True
+
+    def __init__(self, folder_path: str):
+        super().__init__(folder_path)
+        self.members = None
+        self.archive_stat = None
+
+    def list_files(self):
+        stat = super().stat(self.folder_path)
+        if self.members is None or stat != self.archive_stat:
+            with tarfile.open(self.folder_path, 'r|*') as archive:
+                self.members = {os.path.join(self.folder_path, member.name): member
+                                for member in archive if member.isfile()}
+            self.archive_stat = stat
+        return [(split_compression(os.path.basename(path))[0], path) for path in self.members]
+
+    def stat(self, path: str):
+        ''' Identify the version of a member
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            tuple: The size and modification time of the member
+        '''
+        if self.members is None:
+            self.list_files()
+        return self.members[path].size, self.members[path].mtime
+
+    def open(self, path: str):
+        if self.members is None:
+            self.list_files()
+        # a single member costs a pass over the archive up to it
+        name = self.members[path].name
+        with tarfile.open(self.folder_path, 'r:*') as archive:
+            raw = io.BytesIO(archive.extractfile(name).read())
+        return text_stream(raw, name)
+
+    def read_files(self, paths: list):
+        ''' Read data files in one forward pass over the archive
+
+        Args:
+            paths (list): The paths of the data files
+        Yields:
+            tuple: The path and the text of each file, in archive order; a
+                file is closed once the next one is asked for
+        '''
+        wanted = set(paths)
+        with tarfile.open(self.folder_path, 'r|*') as archive:
+            for member in archive:
+                path = os.path.join(self.folder_path, member.name)
+                if member.isfile() and path in wanted:
+                    # members of a stream cannot be wrapped in place, so
+                    # each is decompressed into memory, never to disk
+                    raw = io.BytesIO(archive.extractfile(member).read())
+                    with text_stream(raw, member.name) as f:
+                        yield path, f
+
+
+def open_data_source(path: str):
+    ''' Pick the source of the data files held at a path
+
+    Args:
+        path (str): A folder of data files, or a zip or tar archive of them
+    Returns:
+        DirectorySource: The source
+    Raises:
+        ValueError: If path is a file but not a zip or tar archive
+    '''
+    if not os.path.isfile(path):
+        return DirectorySource(path)
+    if zipfile.is_zipfile(path):
+        return ZipSource(path)
+    if tarfile.is_tarfile(path):
+        return TarSource(path)
+    raise ValueError(f"Data path {path} is neither a folder nor a zip or tar archive")
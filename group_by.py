@@ -0,0 +1,87 @@
+from rollups import RollupTable
+from weather_store import MEASURES, WeatherReadingStore
+
+# keys the rows can be grouped by, from coarsest to finest
+GROUP_KEYS = ('station', 'year', 'month')
+
+# aggregates of a measure over a group; min and max come with their date
+AGGREGATES = ('min', 'max', 'mean', 'count')
+
+
+class GroupByEngine:
+    ''' Aggregate every station's readings grouped by station, year and month
+
+    The rollups are the finest groups, so any grouping is built by merging
+    them in one pass over the months of every station, or over the years
+    when months are not grouped by, whatever the number of groups; the
+    daily rows are never read. Summaries of a group are merged in date
+    order within each station and station by station, so ties keep the
+    first station's earliest date.
+
+    Attributes:
+        weather_readings (dict): Station name to its WeatherReadingStore
+    '''
+
+    def __init__(self, weather_readings: dict):
+        ''' Initialize the engine
+
+        Args:
+            weather_readings (dict): Station name to its WeatherReadingStore
+        '''
+        self.weather_readings = weather_readings
+
+    def group(self, group_by, aggregates):
+        ''' Compute aggregates for every group
+
+        Args:
+            group_by (tuple): The GROUP_KEYS to group by, e.g. ("station", "year")
+            aggregates (tuple): (measure, aggregate) pairs, e.g. ("max_temp", "max")
+        Returns:
+            list: (key, values) per group, sorted by key; key holds the value
+                of each group_by key and values the result of each aggregate
+        Raises:
+            ValueError: If a group key, measure or aggregate is unknown
+        '''
+        for key in group_by:
+            if key not in GROUP_KEYS:
+                raise ValueError(f"Cannot group by {key}; choose from {', '.join(GROUP_KEYS)}")
+        for measure, aggregate in aggregates:
+            if measure not in MEASURES or aggregate not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate {aggregate} of {measure}")
+
+        groups = {}
+        for station, store in sorted(self.weather_readings.items()):
+            if 'month' in group_by:
+                periods = store.rollups.months.items()
+            else:
+                # the yearly rollups already merge the months of each year
+                periods = (((year, None), summaries) for year, summaries in store.rollups.years.items())
+            for (year, month), summaries in sorted(periods):
+                fields = {'station': station, 'year': year, 'month': month}
+                groups.setdefault(tuple(fields[key] for key in group_by), []).append(summaries)
+
+        combine = RollupTable().combine
+        rows = []
+        for key, periods in sorted(groups.items()):
+            merged = periods[0] if len(periods) == 1 else {
+                measure: combine(summaries[measure] for summaries in periods) for measure in periods[0]}
+            rows.append((key, tuple(self.aggregate(merged[measure], aggregate)
+                                    for measure, aggregate in aggregates)))
+        return rows
+
+    def aggregate(self, summary, aggregate: str):
+        ''' Read one aggregate off the summary of a group
+
+        Args:
+            summary (MeasureSummary): The merged summary of the group
+            aggregate (str): One of AGGREGATES
+        Returns:
+            The count, the mean rounded to 2 places, or for min and max the
+                value and its date as "YYYY-M-D"; NaN and None without values
+        '''
+        if aggregate == 'count':
+            return summary.count
+        if aggregate == 'mean':
+            return round(summary.total / summary.count, 2) if summary.count else float('nan')
+        value, day = (summary.min, summary.min_date) if aggregate == 'min' else (summary.max, summary.max_date)
+        return value, None if day is None else WeatherReadingStore.ordinal_string(day)
@@ -0,0 +1,173 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from consts import PROFILE_BUCKETS
+
+
+class StageHistogram:
+    ''' Histogram of the durations of one stage
+
+    Attributes:
+        buckets (list): The count of durations up to each bucket bound
+        total (float): The sum of the durations in seconds
+        count (int): The number of durations
+    '''
+
+    def __init__(self):
+        ''' Initialize an empty histogram '''
+        self.buckets = [0] * (len(PROFILE_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        ''' Record one duration
+
+        Args:
+            seconds (float): The duration
+        '''
+        self.buckets[bisect_left(PROFILE_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Profiler:
+    ''' Per-stage timings and counters of the ingest, calculation and report stages
+
+    Every hook first checks enabled, so a disabled profiler costs one
+    attribute lookup per instrumented call. Stages nest; for_each_station
+    for example also times the reports it runs, so stage totals overlap.
+
+    Attributes:
+        enabled (bool): Whether timings and counters are recorded
+        stages (dict): Stage name to its StageHistogram
+        counters (dict): Counter name to its value
+    '''
+
+    def __init__(self):
+        ''' Initialize a disabled profiler '''
+        self.enabled = False
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        ''' Record one duration of a stage
+
+        Args:
+            name (str): The stage name
+            seconds (float): The duration
+        '''
+        with self.lock:
+            histogram = self.stages.get(name)
+            if histogram is None:
+                histogram = self.stages[name] = StageHistogram()
+            histogram.observe(seconds)
+
+    def count(self, name: str, amount: int = 1):
+        ''' Add to a counter
+
+        Args:
+            name (str): The counter name
+            amount (int): The amount to add
+        '''
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def stage(self, name: str):
+        ''' Time the enclosed block as a stage
+
+        Args:
+            name (str): The stage name
+        '''
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def reset(self):
+        ''' Drop every timing and counter '''
+        with self.lock:
+            self.stages = {}
+            self.counters = {}
+
+    def breakdown(self):
+        ''' Format the timings and counters as a table
+
+        Returns:
+            str: The breakdown, slowest stage first
+        '''
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: -item[1].total)
+            counters = sorted(self.counters.items())
+        lines = [f"{'stage':<48} {'calls':>8} {'total ms':>12} {'mean ms':>10}"]
+        for name, histogram in stages:
+            lines.append(f"{name:<48} {histogram.count:>8} {histogram.total * 1000:>12.2f} "
+                         f"{histogram.total * 1000 / histogram.count:>10.3f}")
+        if counters:
+            lines.append("")
+            lines.extend(f"{name:<48} {value:>8}" for name, value in counters)
+        return "\n".join(lines)
+
+    def prometheus(self):
+        ''' Format the timings and counters in the Prometheus text format
+
+        Returns:
+            str: The exposition, with one histogram series per stage and one
+                counter per counter name
+        '''
+        with self.lock:
+            stages = sorted((name, list(histogram.buckets), histogram.total, histogram.count)
+                            for name, histogram in self.stages.items())
+            counters = sorted(self.counters.items())
+        lines = [
+            "# HELP weatherman_stage_seconds Time spent in each stage",
+            "# TYPE weatherman_stage_seconds histogram",
+        ]
+        for name, buckets, total, count in stages:
+            cumulative = 0
+            for bound, bucket in zip((*PROFILE_BUCKETS, '+Inf'), buckets):
+                cumulative += bucket
+                lines.append(f'weatherman_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'weatherman_stage_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'weatherman_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, value in counters:
+            lines.append(f"# TYPE weatherman_{name}_total counter")
+            lines.append(f"weatherman_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+
+# the profiler shared by every instrumented module
+profiler = Profiler()
+
+
+def profiled(prefix: str):
+    ''' Time every call of the decorated function as a stage
+
+    Args:
+        prefix (str): The stage name prefix; the function name is appended
+    Returns:
+        callable: The decorator
+    '''
+    def decorator(function):
+        name = f"{prefix}.{function.__name__}"
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
@@ -0,0 +1,121 @@
+from array import array
+from itertools import accumulate
+from math import isnan
+
+
+class RangeQueryEngine:
+    ''' Constant-time min/max/mean of any row range of a store
+
+    Means come from prefix sums and prefix counts of the non-missing values.
+    Extremes come from sparse tables of row positions, built lazily for the
+    measures that are queried: level k holds, for every row, the position of
+    the extreme of the 2**k rows starting there, so any range is covered by
+    two overlapping power-of-two windows. Ties keep the earliest row.
+
+    Attributes:
+        store (WeatherReadingStore): The indexed store the engine answers for
+    '''
+
+    def __init__(self, store):
+        ''' Initialize the engine
+
+        Args:
+            store (WeatherReadingStore): The sorted store to query
+        '''
+        self.store = store
+        self.prefixes_by_measure = {}
+        self.sparse_tables = {}
+
+    def prefixes(self, measure: str):
+        ''' Build the prefix sums and counts of a measure on first use
+
+        Args:
+            measure (str): The measure name
+        Returns:
+            tuple: The prefix sums and the prefix counts, both of length n + 1
+        '''
+        prefixes = self.prefixes_by_measure.get(measure)
+        if prefixes is None:
+            column = self.store.column(measure)
+            sums = array('d', accumulate((0.0 if isnan(value) else value for value in column), initial=0.0))
+            counts = array('l', accumulate((0 if isnan(value) else 1 for value in column), initial=0))
+            # published together, so other threads see both arrays or neither
+            prefixes = self.prefixes_by_measure[measure] = (sums, counts)
+        return prefixes
+
+    def sparse_table(self, measure: str, largest: bool):
+        ''' Build the sparse table of a measure's extremes on first use
+
+        Args:
+            measure (str): The measure name
+            largest (bool): True for maxima, False for minima
+        Returns:
+            list: The levels of the table, each an array of row positions
+        '''
+        key = (measure, largest)
+        if key in self.sparse_tables:
+            return self.sparse_tables[key]
+
+        column = self.store.column(measure)
+        # missing values never win: they rank below every real value
+        missing = float('-inf') if largest else float('inf')
+        values = [missing if isnan(value) else value for value in column]
+
+        def better(left: int, right: int):
+            if largest:
+                return right if values[right] > values[left] else left
+            return right if values[right] < values[left] else left
+
+        levels = [array('l', range(len(values)))]
+        width = 1
+        while width * 2 <= len(values):
+            previous = levels[-1]
+            levels.append(array('l', (better(previous[row], previous[row + width])
+                                      for row in range(len(values) - width * 2 + 1))))
+            width *= 2
+        self.sparse_tables[key] = levels
+        return levels
+
+    def extreme(self, measure: str, rows: slice, largest: bool):
+        ''' Find the largest or smallest non-missing value in a row range
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The non-empty rows to search
+            largest (bool): True for the maximum, False for the minimum
+        Returns:
+            tuple: The value and its row, or (nan, None) if all are missing
+        '''
+        _, counts = self.prefixes(measure)
+        if counts[rows.stop] == counts[rows.start]:
+            return float('nan'), None
+
+        levels = self.sparse_table(measure, largest)
+        level = (rows.stop - rows.start).bit_length() - 1
+        left = levels[level][rows.start]
+        right = levels[level][rows.stop - (1 << level)]
+        column = self.store.column(measure)
+        if isnan(column[left]):
+            row = right
+        elif isnan(column[right]):
+            row = left
+        elif largest:
+            row = right if column[right] > column[left] else left
+        else:
+            row = right if column[right] < column[left] else left
+        return column[row], row
+
+    def mean(self, measure: str, rows: slice):
+        ''' Average the non-missing values in a row range
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to average
+        Returns:
+            float: The average, or nan if all are missing
+        '''
+        sums, counts = self.prefixes(measure)
+        count = counts[rows.stop] - counts[rows.start]
+        if not count:
+            return float('nan')
+        return (sums[rows.stop] - sums[rows.start]) / count
@@ -1,22 +1,24 @@
 import sys
-from dict_data_item import DictDataItem
-from consts import RED_COLOR, BLUE_COLOR, RESET_COLOR
+from math import isnan
+from calculation_results import CalculationResult
+from chart_renderer import ChartRenderer
+from profiling import profiled
 
 
 class ReportGenerator():
     ''' Class to generate reports
 
     Attributes:
-        result (DictDataItem): The calculation results
+        result (CalculationResult): The calculation results
         months (List): List of month names
 
     '''
 
-    def __init__(self, result: DictDataItem):
+    def __init__(self, result: CalculationResult):
         ''' Initialize the report generator with the calculation results
 
         Args:
-            result (DictDataItem): The calculation results
+            result (CalculationResult): The calculation results
 
         '''
 
@@ -42,6 +44,55 @@ class ReportGenerator():
         _, month_num, day = date.split("-")
         return f"{self.months[int(month_num) - 1]} {day}"
 
+    def format_full_date(self, date: str):
+        ''' Format the date in the format "Month Day, Year"
+
+        Args:
+            date (str): The date in the format "YYYY-MM-DD", or None
+
+        Returns:
+            str: The formatted date, or "no data" for a missing date
+        '''
+        if date is None:
+            return "no data"
+        year, _, _ = date.split("-")
+        return f"{self.format_date(date)}, {year}"
+
+    def format_value(self, value: float, width: int, spec: str):
+        ''' Format a number right-aligned in a column
+
+        Args:
+            value (float): The number, or nan when it is missing
+            width (int): The width of the column
+            spec (str): The format of the number, e.g. "+.2f"
+
+        Returns:
+            str: The formatted number, or "n/a" for a missing number
+        '''
+        if isnan(value):
+            return "n/a".rjust(width)
+        return format(value, spec).rjust(width)
+
+    def format_measurement(self, value: float, spec: str, unit: str, date: str = None):
+        ''' Format a measurement with its unit and the date it was read on
+
+        Args:
+            value (float): The measurement, or nan when it is missing
+            spec (str): The format of the number, e.g. ".2f"
+            unit (str): The unit written after the number, e.g. "hPa"
+            date (str): The date in the format "YYYY-MM-DD", or None
+
+        Returns:
+            str: The formatted measurement, or "n/a" for a missing one
+        '''
+        text = self.format_value(value, 0, spec)
+        if isnan(value):
+            return text
+        if date is None:
+            return f"{text}{unit}"
+        return f"{text}{unit} on {self.format_full_date(date)}"
+
+    @profiled('report')
     def generate_year_extremes_report(self):
         ''' Generate a report string for the year's extremes
 
@@ -64,6 +115,30 @@ class ReportGenerator():
 
         return report_string
 
+    @profiled('report')
+    def generate_date_range_report(self):
+        ''' Generate a report string for the extremes and averages of a date range
+
+        Returns:
+            str: The report string
+        '''
+        first_date = self.result.get_data('first_date')
+        last_date = self.result.get_data('last_date')
+        report_string = f"{first_date.isoformat()} to {last_date.isoformat()} ({
+            self.result.get_data('days')} days with readings)\n"
+        report_string += f"Highest: {self.result.get_data('max_temp')}C on {
+            self.format_full_date(self.result.get_data('max_temp_date'))}\n"
+        report_string += f"Lowest: {self.result.get_data('min_temp')}C on {
+            self.format_full_date(self.result.get_data('min_temp_date'))}\n"
+        report_string += f"Humidity: {self.result.get_data('max_humidity')}% on {
+            self.format_full_date(self.result.get_data('max_humidity_date'))}\n"
+        report_string += (f"Avg Lowest Temp: {self.result.get_data("avg_lowest_temp"):.2f}C\n"
+                          f"Avg Highest Temp: {self.result.get_data("avg_highest_temp"):.2f}C\n"
+                          f"Avg Mean Humidity: {self.result.get_data("avg_mean_humidity"):.2f}%\n")
+
+        return report_string
+
+    @profiled('report')
     def get_yearly_extremes_object(self):
         ''' Generate a report object for the year's extremes
 
@@ -81,6 +156,7 @@ class ReportGenerator():
             "year": self.result.get_data('year'),
         }
 
+    @profiled('report')
     def generate_month_avg_report(self):
         '''
         Generate a report string for the month's averages
@@ -96,6 +172,122 @@ class ReportGenerator():
 
         return report_string
 
+    @profiled('report')
+    def generate_rolling_report(self):
+        '''
+        Generate a report string for the month's moving averages and anomalies
+
+        Returns:
+            str: The report string
+        '''
+        averages = self.result.get_data('averages')
+        columns = [(days, measure) for measure in next(iter(averages.values()), {}) for days in averages]
+        labels = [self.format_date(date) for date in self.result.get_data('dates')]
+        width = max(map(len, labels + ["Day"]))
+        report_string = f"{'Day':<{width}}" + "".join(
+            f"{measure.replace('_', ' ').title()[:10]:>11} {days:>2}d" for days, measure in columns) + "\n"
+        for position, label in enumerate(labels):
+            report_string += f"{label:<{width}}" + "".join(
+                f"{averages[days][measure][position]:>15.2f}" for days, measure in columns) + "\n"
+
+        anomalies = self.result.get_data('anomalies')
+        report_string += f"Anomalies: {len(anomalies) or 'none'}\n"
+        for anomaly in anomalies:
+            report_string += (f"{self.format_date(anomaly.date)}: {anomaly.measure} {anomaly.value} is "
+                              f"{anomaly.deviations:+.2f} std devs from {anomaly.window_mean} "
+                              f"(std {anomaly.window_std})\n")
+
+        return report_string
+
+    @profiled('report')
+    def generate_departures_report(self):
+        '''
+        Generate a report string for the month's daily departures from normal
+
+        Returns:
+            str: The report string
+        '''
+        measures = list(self.result.get_data('values'))
+        normal_years = self.result.get_data('normal_years')
+        labels = [self.format_date(date) for date in self.result.get_data('dates')]
+        width = max(map(len, labels + ["Day", "Mean"]))
+        report_string = f"Normals of {len(normal_years)} years, {normal_years[0]} to {normal_years[-1]}\n"
+        report_string += f"{'Day':<{width}}" + "".join(
+            f"{measure.replace('_', ' ').title():>22}" for measure in measures) + "\n"
+        report_string += " " * width + "".join(f"{'value':>7}{'normal':>7}{'depart':>8}" for _ in measures) + "\n"
+        for position, label in enumerate(labels):
+            report_string += f"{label:<{width}}" + "".join(
+                self.format_value(self.result.get_data('values')[measure][position], 7, ".1f")
+                + self.format_value(self.result.get_data('normals')[measure][position].mean, 7, ".1f")
+                + self.format_value(self.result.get_data('departures')[measure][position], 8, "+.2f")
+                for measure in measures) + "\n"
+        mean_departures = self.result.get_data('mean_departures')
+        report_string += f"{'Mean':<{width}}" + "".join(
+            self.format_value(mean_departures[measure], 22, "+.2f") for measure in measures) + "\n"
+
+        return report_string
+
+    @profiled('report')
+    def generate_grouped_report(self):
+        '''
+        Generate a table of the aggregates of every group, one row per group
+
+        Returns:
+            str: The report string
+        '''
+        group_by = self.result.get_data('group_by')
+        aggregates = self.result.get_data('aggregates')
+        rows = self.result.get_data('rows')
+        widths = {'year': 4, 'month': 9}
+        if 'station' in group_by:
+            position = group_by.index('station')
+            widths['station'] = max(len('Station'), *(len(key[position]) for key, _ in rows))
+        titles = [f"{measure.replace('_', ' ').title()} {aggregate}" for measure, aggregate in aggregates]
+
+        def cell(aggregate, value):
+            if aggregate in ('min', 'max'):
+                value, date = value
+                return f"{value:>7.1f} {'' if date is None else self.format_date(date):<12}"
+            if aggregate == 'mean':
+                return f"{value:>20.2f}"
+            return f"{value:>20}"
+
+        report_string = " ".join(f"{key.title():<{widths[key]}}" for key in group_by)
+        report_string += "".join(f" {title:>20}" for title in titles) + "\n"
+        for key, values in rows:
+            fields = {name: value for name, value in zip(group_by, key)}
+            if 'month' in fields:
+                fields['month'] = self.months[fields['month'] - 1]
+            line = " ".join(f"{fields[name]:<{widths[name]}}" for name in group_by)
+            line += "".join(f" {cell(aggregate, value)}" for (_, aggregate), value in zip(aggregates, values))
+            report_string += line.rstrip() + "\n"
+
+        return report_string
+
+    @profiled('report')
+    def generate_month_conditions_report(self):
+        '''
+        Generate a report string for the month's precipitation, wind, pressure and dew point
+
+        Returns:
+            str: The report string
+        '''
+        report_string = f"Precipitation: {self.format_measurement(
+            self.result.get_data('total_precipitation'), '', 'mm')} on {self.result.get_data('wet_days')} days\n"
+        report_string += f"Highest Wind Speed: {self.format_measurement(
+            self.result.get_data('max_wind_speed'), '', 'km/h', self.result.get_data('max_wind_speed_date'))}\n"
+        report_string += f"Highest Gust Speed: {self.format_measurement(
+            self.result.get_data('max_gust_speed'), '', 'km/h', self.result.get_data('max_gust_speed_date'))}\n"
+        report_string += f"Lowest Pressure: {self.format_measurement(
+            self.result.get_data('min_pressure'), '', 'hPa', self.result.get_data('min_pressure_date'))}\n"
+        report_string += f"Avg Mean Pressure: {self.format_measurement(
+            self.result.get_data('avg_mean_pressure'), '.2f', 'hPa')}\n"
+        report_string += f"Avg Mean Dew Point: {self.format_measurement(
+            self.result.get_data('avg_mean_dew_point'), '.2f', 'C')}\n"
+
+        return report_string
+
+    @profiled('report')
     def get_month_avg_object(self):
         '''
         Generate a report object for the month's averages
@@ -111,31 +303,21 @@ class ReportGenerator():
             "year": self.result.get_data("year")
         }
 
+    @profiled('report')
     def print_month_extremes_bar_chart(self):
         ''' Print a bar chart for the month's temperature extremes
         '''
-        response_string = ""
-
         # adjust for zero-based index
         print(f"{self.months[self.result.get_data('month')-1]} {
             self.result.get_data('year')}")
 
-        for day, (max_temp, min_temp) in enumerate(zip(
-                self.result.get_data('max_temps'), self.result.get_data('min_temps')), start=1):
-
-            max_bar = RED_COLOR + '+' * \
-                int(max_temp) + RESET_COLOR + f" {int(max_temp)}C"
-
-        # generate bar for min temp in blue
-            min_bar = BLUE_COLOR + '+' * \
-                int(min_temp) + RESET_COLOR + f" {int(min_temp)}C"
-
-            response_string += f"{day:02} {max_bar}\n{day:02} {min_bar}\n"
+        response_string = self.render_chart('ansi', net=False, headings=False)
 
         print("\n")
         print(response_string)
         return response_string
 
+    @profiled('report')
     def get_month_extremes_data(self):
         '''
         Get a JSON object for the month's temperature extremes
@@ -159,21 +341,25 @@ class ReportGenerator():
 
         return response_data
 
+    @profiled('report')
     def print_net_month_extremes_bar_chart(self):
         ''' Print a bar chart for the month's net temperature extremes
         '''
-        response_string = ""
         # prints a bar chart for month's net extremes
-        for day, (max_temp, min_temp) in enumerate(
-            zip(self.result.get_data('max_temps'),
-                self.result.get_data('min_temps')),
-            start=1
-        ):
-            net_bar = (
-                BLUE_COLOR + '+' * int(min_temp) + RESET_COLOR +
-                RED_COLOR + '+' * int(max_temp - min_temp) + RESET_COLOR +
-                f" {int(min_temp):02}C - {int(max_temp):02}C"
-            )
-            response_string += f"{day:02} {net_bar}\n"
-            print(f"{day:02} {net_bar}")
+        response_string = self.render_chart('ansi', net=True, headings=False)
+        print(response_string, end="")
         return response_string
+
+    @profiled('report')
+    def render_chart(self, chart_format: str, net: bool = True, headings: bool = True):
+        ''' Render the chart of a month, or of every month of a year, in one pass
+
+        Args:
+            chart_format (str): "ansi", "html" or "svg"
+            net (bool): Whether each day is one lowest-to-highest bar
+            headings (bool): Whether each month starts with its name and year
+        Returns:
+            str: The rendered chart
+        '''
+        months = self.result.get_data('months') or (self.result,)
+        return ChartRenderer(chart_format, net=net, headings=headings).render(months)
@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+# data structure to hold a rendered report response
+CachedResponse = namedtuple('CachedResponse', ['body', 'etag'])
+
+
+class ResponseCache:
+    ''' Bounded LRU cache of rendered report responses
+
+    Entries belong to one dataset version; asking for a newer version drops
+    every entry, so a reload of the data never serves a stale report.
+
+    Attributes:
+        maxsize (int): The maximum number of entries
+        version (int): The dataset version the entries were rendered from
+    '''
+
+    def __init__(self, maxsize: int):
+        ''' Initialize the cache
+
+        Args:
+            maxsize (int): The maximum number of entries
+        '''
+        self.maxsize = maxsize
+        self.version = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def normalize_key(self, route: str, params):
+        ''' Build a cache key which ignores parameter order and formatting
+
+        Args:
+            route (str): The request path
+            params (iterable): The (name, value) query parameters
+        Returns:
+            tuple: The cache key
+        '''
+        normalized = []
+        for name, value in params:
+            value = value.strip()
+            if value.lstrip('-').isdigit():
+                # "03" and "3" are the same month
+                value = str(int(value))
+            normalized.append((name, value))
+        return route, tuple(sorted(normalized))
+
+    def get(self, key: tuple, version: int):
+        ''' Look up a response rendered from a dataset version
+
+        Args:
+            key (tuple): The cache key
+            version (int): The current dataset version
+        Returns:
+            CachedResponse: The cached response, or None on a miss
+        '''
+        with self.lock:
+            if version != self.version:
+                self.entries.clear()
+                self.version = version
+                return None
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, version: int, body):
+        ''' Store a rendered response
+
+        Args:
+            key (tuple): The cache key
+            version (int): The dataset version the body was rendered from
+            body (str): The rendered response body
+        Returns:
+            CachedResponse: The cached response with its ETag
+        '''
+        # the ETag only depends on the body, so a reload which leaves a
+        # report unchanged still answers its pollers with 304
+        entry = CachedResponse(body, hashlib.sha1(str(body).encode('utf-8')).hexdigest())
+        with self.lock:
+            if version != self.version:
+                return entry
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return entry
@@ -0,0 +1,121 @@
+from collections import namedtuple
+
+# summary of one measure over a month or a year; dates are ordinals
+MeasureSummary = namedtuple('MeasureSummary', [
+    'total', 'count', 'min', 'min_date', 'max', 'max_date'
+])
+
+EMPTY_SUMMARY = MeasureSummary(0.0, 0, float('nan'), None, float('nan'), None)
+
+
+class RollupTable:
+    ''' Materialized monthly and yearly summaries of every measure
+
+    Monthly summaries are computed from the rows of the month, and yearly
+    summaries are derived from the monthly ones, so reports never touch the
+    daily rows and replacing a month only recomputes that month and its year.
+
+    Attributes:
+        months (dict): (year, month) to {measure: MeasureSummary}
+        years (dict): Year to {measure: MeasureSummary}
+    '''
+
+    def __init__(self, months=None):
+        ''' Initialize the table
+
+        Args:
+            months (dict): Monthly summaries to start from
+        '''
+        self.months = dict(months or {})
+        self.years = {}
+        for year in {year for year, _ in self.months}:
+            self.roll_up_year(year)
+
+    def summarize(self, store, measure: str, rows: slice):
+        ''' Summarize one measure over some rows of a store
+
+        Args:
+            store (WeatherReadingStore): The columnar store of readings
+            measure (str): The measure name
+            rows (slice): The rows to summarize
+        Returns:
+            MeasureSummary: The summary
+        '''
+        total, count = store.nan_sum_count(measure, rows)
+        if not count:
+            return EMPTY_SUMMARY
+        minimum, min_row = store.nan_min(measure, rows)
+        maximum, max_row = store.nan_max(measure, rows)
+        return MeasureSummary(total, count, minimum, store.dates[min_row],
+                              maximum, store.dates[max_row])
+
+    def combine(self, summaries):
+        ''' Merge summaries given in date order
+
+        Ties keep the earliest date, matching a scan over the daily rows.
+
+        Args:
+            summaries (iterable): The MeasureSummary objects
+        Returns:
+            MeasureSummary: The merged summary
+        '''
+        total, count = 0.0, 0
+        minimum = maximum = EMPTY_SUMMARY
+        for summary in summaries:
+            if not summary.count:
+                continue
+            total += summary.total
+            count += summary.count
+            if not minimum.count or summary.min < minimum.min:
+                minimum = summary
+            if not maximum.count or summary.max > maximum.max:
+                maximum = summary
+        if not count:
+            return EMPTY_SUMMARY
+        return MeasureSummary(total, count, minimum.min, minimum.min_date,
+                              maximum.max, maximum.max_date)
+
+    def roll_up_year(self, year: int):
+        ''' Derive the yearly summaries of a year from its months
+
+        Args:
+            year (int): The year
+        '''
+        months = [self.months[(year, month)] for month in range(1, 13)
+                  if (year, month) in self.months]
+        if not months:
+            self.years.pop(year, None)
+            return
+        self.years[year] = {measure: self.combine(summaries[measure] for summaries in months)
+                            for measure in months[0]}
+
+    def update(self, store, months, measures):
+        ''' Recompute the summaries of some months and of their years
+
+        Args:
+            store (WeatherReadingStore): The indexed store holding the months
+            months (iterable): The (year, month) pairs to recompute
+            measures (tuple): The measures to summarize
+        '''
+        years = set()
+        for year, month in months:
+            rows = store.month_index.get((year, month))
+            if rows is None:
+                self.months.pop((year, month), None)
+            else:
+                self.months[(year, month)] = {
+                    measure: self.summarize(store, measure, rows) for measure in measures}
+            years.add(year)
+        for year in years:
+            self.roll_up_year(year)
+
+    def without_months(self, months):
+        ''' Copy the table, leaving out some months
+
+        Args:
+            months (set): The (year, month) pairs to leave out
+        Returns:
+            RollupTable: The new table
+        '''
+        return RollupTable({year_month: summaries for year_month, summaries in self.months.items()
+                            if year_month not in months})
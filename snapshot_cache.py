@@ -0,0 +1,188 @@
+import fcntl
+import mmap
+import os
+import pickle
+from array import array
+from weather_store import WeatherReadingStore
+
+# bump when the snapshot layout changes so stale snapshots are ignored
+SNAPSHOT_VERSION = 3
+
+# the data file is rewritten once dropped entries take up this share of it
+SNAPSHOT_GARBAGE_RATIO = 0.5
+
+
+class SnapshotCache:
+    ''' On-disk snapshot of parsed data files
+
+    Each data file is stored as the raw bytes of its date and measure
+    columns, plus the field texts of the measures not converted yet. The
+    entries are appended to a data file next to the snapshot and read
+    through a memory map, so a query only reads the entries of the files
+    it selects and saving only writes the new ones. The snapshot itself is
+    an index of where each entry lies, keyed by the full path of the file
+    together with the size and modification time it had when parsed (for
+    an archive member, whatever else identifies its version). A file whose
+    version has changed misses the cache and is parsed again.
+
+    Attributes:
+        path (str): The path of the snapshot index
+        generation (int): The number of the data file the index points into
+        index (dict): Full file path to (stat, offset, length) of its entry
+        pending (dict): Full file path to (stat, entry) not saved yet
+        dropped (set): Full file paths whose entries are to be removed
+    '''
+
+    def __init__(self, path: str):
+        ''' Initialize the cache, reading the snapshot index if there is one
+
+        Args:
+            path (str): The path of the snapshot index
+        '''
+        self.path = path
+        self.pending = {}
+        self.dropped = set()
+        self.data = None
+        self.load()
+
+    def data_path(self, generation: int = None):
+        ''' Get the path of a data file
+
+        Args:
+            generation (int): The number of the data file, or None for the
+                one the index points into
+        Returns:
+            str: The path of the data file
+        '''
+        return f"{self.path}.{self.generation if generation is None else generation}.data"
+
+    def load(self):
+        ''' Read the snapshot index, ignoring one that is missing or stale '''
+        self.generation, self.index = 0, {}
+        try:
+            with open(self.path, 'rb') as f:
+                version, generation, index = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return
+        if version == SNAPSHOT_VERSION:
+            self.generation, self.index = generation, index
+
+    def mapped_data(self):
+        ''' Map the data file into memory on first use
+
+        Returns:
+            mmap.mmap: The read-only contents of the data file
+        '''
+        if self.data is None:
+            with open(self.data_path(), 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.data
+
+    def save(self):
+        ''' Append the new entries and rewrite the index, if anything changed
+
+        The snapshot is locked meanwhile and its index read again, so the
+        entries another process saved since this one read it are kept.
+        '''
+        if not self.pending and not self.dropped:
+            return
+        with open(f"{self.path}.lock", 'wb') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.close()
+            self.load()
+            for key in self.dropped:
+                self.index.pop(key, None)
+            with open(self.data_path(), 'ab') as f:
+                offset = f.seek(0, os.SEEK_END)
+                for key, (stat, entry) in self.pending.items():
+                    f.write(entry)
+                    self.index[key] = (stat, offset, len(entry))
+                    offset += len(entry)
+
+            generation = self.generation
+            live = sum(length for _, _, length in self.index.values())
+            if offset - live > offset * SNAPSHOT_GARBAGE_RATIO:
+                generation = self.compact()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'wb') as f:
+                pickle.dump((SNAPSHOT_VERSION, generation, self.index), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.path)
+            if generation != self.generation:
+                # a process still reading the old data file keeps its map
+                os.unlink(self.data_path())
+                self.generation = generation
+        self.pending = {}
+        self.dropped = set()
+
+    def compact(self):
+        ''' Copy the entries still indexed into the next data file
+
+        Returns:
+            int: The number of the new data file
+        '''
+        generation = self.generation + 1
+        with open(self.data_path(), 'rb') as old, open(self.data_path(generation), 'wb') as new:
+            data = old.read()
+            offset = 0
+            for key, (stat, start, length) in self.index.items():
+                new.write(data[start:start + length])
+                self.index[key] = (stat, offset, length)
+                offset += length
+        return generation
+
+    def close(self):
+        ''' Unmap the data file; it is mapped again when next read '''
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+
+    def get(self, path: str, stat: tuple):
+        ''' Rebuild the parsed readings of a file if they are still fresh
+
+        Args:
+            path (str): The path of the data file
+            stat (tuple): The version of the file now, its size and mtime
+        Returns:
+            WeatherReadingStore: The cached readings, or None on a miss
+        '''
+        entry = self.index.get(os.path.abspath(path))
+        if entry is None or entry[0] != tuple(stat):
+            return None
+        _, offset, length = entry
+        try:
+            dates, columns, raw_columns = pickle.loads(self.mapped_data()[offset:offset + length])
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            # the data file is gone or cut short; parse the file again
+            return None
+
+        partition = WeatherReadingStore(array('l'), {}, {
+            measure: list(values) for measure, values in raw_columns.items()})
+        partition.dates.frombytes(dates)
+        for measure, values in columns.items():
+            partition.columns[measure] = array('d', values)
+        return partition
+
+    def put(self, path: str, stat: tuple, partition: WeatherReadingStore):
+        ''' Record the parsed readings of a file, to be written by save
+
+        Args:
+            path (str): The path of the data file
+            stat (tuple): The version of the file parsed, its size and mtime
+            partition (WeatherReadingStore): The readings parsed from it
+        '''
+        self.pending[os.path.abspath(path)] = (tuple(stat), pickle.dumps((
+            partition.dates.tobytes(),
+            {measure: column.tobytes() for measure, column in partition.columns.items()},
+            {measure: tuple(raw_column) for measure, raw_column in partition.raw_columns.items()},
+        ), pickle.HIGHEST_PROTOCOL))
+
+    def prune(self, folder_path: str, paths):
+        ''' Drop the entries of files that are no longer in a folder or archive
+
+        Args:
+            folder_path (str): The folder or archive holding the data files
+            paths (iterable): The paths of the data files it holds now
+        '''
+        root = os.path.join(os.path.abspath(folder_path), '')
+        current = {os.path.abspath(path) for path in paths}
+        self.dropped.update(key for key in self.index if key.startswith(root) and key not in current)
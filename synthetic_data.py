@@ -0,0 +1,145 @@
+import argparse
+import math
+import os
+import random
+from calendar import month_abbr, monthrange
+
+# header of the data files, copied from the real ones
+HEADER = ("PKT,Max TemperatureC,Mean TemperatureC,Min TemperatureC,Dew PointC,MeanDew PointC,Min DewpointC,"
+          "Max Humidity, Mean Humidity, Min Humidity, Max Sea Level PressurehPa, Mean Sea Level PressurehPa,"
+          " Min Sea Level PressurehPa, Max VisibilityKm, Mean VisibilityKm, Min VisibilitykM,"
+          " Max Wind SpeedKm/h, Mean Wind SpeedKm/h, Max Gust SpeedKm/h,Precipitationmm, CloudCover,"
+          " Events,WindDirDegrees")
+
+EVENTS = ('', '', '', '', 'Rain', 'Fog', 'Thunderstorm', 'Rain-Thunderstorm')
+
+
+class SyntheticWeatherGenerator:
+    ''' Write data files in the format of the real ones, for any scale
+
+    Readings follow a yearly temperature cycle with daily noise, and each
+    field is left empty with the given probability. The same seed always
+    writes the same files.
+
+    Attributes:
+        stations (list): The station names
+        first_year (int): The first year written
+        last_year (int): The last year written
+        missing_rate (float): The probability of a field being empty
+    '''
+
+    def __init__(self, stations: list, first_year: int, last_year: int, missing_rate: float = 0.05,
+                 seed: int = 0):
+        ''' Initialize the generator
+
+        Args:
+            stations (list): The station names
+            first_year (int): The first year written
+            last_year (int): The last year written, inclusive
+            missing_rate (float): The probability of a field being empty
+            seed (int): The seed of the random generator
+        '''
+        self.stations = stations
+        self.first_year = first_year
+        self.last_year = last_year
+        self.missing_rate = missing_rate
+        self.random = random.Random(seed)
+
+    def field(self, value):
+        ''' Format a field, leaving it empty at the missing rate
+
+        Args:
+            value: The value
+        Returns:
+            str: The field text
+        '''
+        if self.random.random() < self.missing_rate:
+            return ''
+        return str(value)
+
+    def row(self, year: int, month: int, day: int, climate: float):
+        ''' Build the line of one day
+
+        Args:
+            year (int): The year
+            month (int): The month
+            day (int): The day
+            climate (float): The station's temperature offset
+        Returns:
+            str: The line, without its newline
+        '''
+        day_of_year = (month - 1) * 30.5 + day
+        mean_temp = round(climate + 12 * math.sin((day_of_year - 105) / 365 * 2 * math.pi)
+                          + self.random.gauss(0, 3))
+        spread = self.random.randint(2, 8)
+        dew_point = mean_temp - self.random.randint(2, 12)
+        humidity = self.random.randint(20, 90)
+        pressure = self.random.randint(995, 1025)
+        wind = self.random.randint(0, 30)
+        rain = round(self.random.expovariate(1 / 8), 1) if self.random.random() < 0.2 else 0.0
+        fields = [
+            mean_temp + spread, mean_temp, mean_temp - spread,
+            dew_point + 2, dew_point, dew_point - 2,
+            min(100, humidity + 15), humidity, max(0, humidity - 15),
+            pressure + 3, pressure, pressure - 3,
+            10.0, round(self.random.uniform(2, 10), 1), round(self.random.uniform(0, 2), 1),
+            wind + 5, wind, wind + self.random.randint(5, 20),
+            rain, self.random.randint(0, 8),
+        ]
+        return ','.join([f"{year}-{month}-{day}", *map(self.field, fields),
+                         self.random.choice(EVENTS), self.field(self.random.randint(0, 359))])
+
+    def write(self, folder_path: str):
+        ''' Write one file per station and month
+
+        Args:
+            folder_path (str): The folder to write into, created if needed
+        Returns:
+            int: The number of rows written
+        '''
+        os.makedirs(folder_path, exist_ok=True)
+        rows = 0
+        for station in self.stations:
+            climate = self.random.uniform(8, 26)
+            for year in range(self.first_year, self.last_year + 1):
+                for month in range(1, 13):
+                    days = monthrange(year, month)[1]
+                    path = os.path.join(folder_path, f"{station}_weather_{year}_{month_abbr[month]}.txt")
+                    with open(path, "w") as f:
+                        f.write(HEADER + "\n")
+                        for day in range(1, days + 1):
+                            f.write(self.row(year, month, day, climate) + "\n")
+                    rows += days
+        return rows
+
+
+def station_names(count: int):
+    ''' Name synthetic stations
+
+    Args:
+        count (int): The number of stations
+    Returns:
+        list: The station names
+    '''
+    return [f"Station{number:03}" for number in range(1, count + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic weather data files")
+    parser.add_argument("data_dir", type=str, help="Folder to write the data files into")
+    parser.add_argument("--stations", type=int, default=10, help="Number of stations")
+    parser.add_argument("--first-year", type=int, default=1996, help="First year")
+    parser.add_argument("--last-year", type=int, default=2016, help="Last year, inclusive")
+    parser.add_argument("--missing-rate", type=float, default=0.05,
+                        help="Probability of a field being empty")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    args = parser.parse_args()
+
+    generator = SyntheticWeatherGenerator(station_names(args.stations), args.first_year, args.last_year,
+                                          missing_rate=args.missing_rate, seed=args.seed)
+    rows = generator.write(args.data_dir)
+    print(f"Wrote {rows} rows to {args.data_dir}")
+
+
+if __name__ == "__main__":
+    main()
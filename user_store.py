@@ -0,0 +1,104 @@
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+class UserStore:
+    ''' SQLite-backed store of the users created through the web app
+
+    Each signup is a single indexed INSERT in its own transaction, so its
+    cost does not grow with the number of users and concurrent signups
+    cannot overwrite each other.
+
+    Attributes:
+        db_path (str): The path of the SQLite database
+    '''
+
+    def __init__(self, db_path: str, legacy_json_path: str = None):
+        ''' Initialize the store, creating the schema if needed
+
+        Args:
+            db_path (str): The path of the SQLite database
+            legacy_json_path (str): Optional users.json imported when the
+                database is created
+        '''
+        self.db_path = db_path
+        with self.connect() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('''CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT NOT NULL,
+                age TEXT NOT NULL
+            )''')
+            connection.execute('CREATE INDEX IF NOT EXISTS users_email ON users (email)')
+            empty = connection.execute('SELECT NOT EXISTS (SELECT 1 FROM users)').fetchone()[0]
+            if empty and legacy_json_path and os.path.exists(legacy_json_path):
+                self.import_json(connection, legacy_json_path)
+
+    @contextmanager
+    def connect(self):
+        ''' Open a connection for one transaction; each request gets its own
+
+        The transaction is committed on success, rolled back on error, and
+        the connection is closed either way.
+
+        Yields:
+            sqlite3.Connection: The connection
+        '''
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def import_json(self, connection: sqlite3.Connection, json_path: str):
+        ''' Import the users of a users.json file
+
+        Args:
+            connection (sqlite3.Connection): The open connection
+            json_path (str): The path of the JSON file
+        '''
+        with open(json_path, 'r') as file:
+            users = json.load(file)
+        connection.executemany(
+            'INSERT INTO users (name, email, age) VALUES (:name, :email, :age)', users)
+
+    def add_user(self, name: str, email: str, age: str):
+        ''' Insert a user atomically
+
+        Args:
+            name (str): The name
+            email (str): The email
+            age (str): The age
+        '''
+        with self.connect() as connection:
+            connection.execute(
+                'INSERT INTO users (name, email, age) VALUES (?, ?, ?)', (name, email, age))
+
+    def count(self):
+        ''' Count the users
+
+        Returns:
+            int: The number of users
+        '''
+        with self.connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def page(self, page: int, per_page: int):
+        ''' Fetch one page of users in signup order
+
+        Args:
+            page (int): The page number, starting at 1
+            per_page (int): The number of users per page
+        Returns:
+            list: The users of the page as dicts
+        '''
+        with self.connect() as connection:
+            rows = connection.execute(
+                'SELECT name, email, age FROM users ORDER BY id LIMIT ? OFFSET ?',
+                (per_page, (page - 1) * per_page))
+            return [dict(row) for row in rows]
@@ -1,70 +1,444 @@
-import os
+import multiprocessing
+from array import array
+import re
+import threading
+from calendar import month_abbr
 from collections import namedtuple
-from consts import (
-    DATE_INDEX,
-    MAX_TEMP_INDEX,
-    MEAN_TEMP_INDEX,
-    MIN_TEMP_INDEX,
-    MAX_HUMIDITY_INDEX,
-    MEAN_HUMIDITY_INDEX,
-    MIN_HUMIDITY_INDEX
-)
-
-# data structure to hold weather readings for a given day
-WeatherReading = namedtuple('WeatherReading', [
-    'date', 'max_temp', 'mean_temp', 'min_temp', 'max_humidity', 'mean_humidity', 'min_humidity'
-])
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import islice, repeat
+from consts import DATE_INDEX, STREAM_BATCH_SIZE, WEATHER_FILE_PATTERN
+from data_sources import open_data_source
+from profiling import profiled, profiler
+from snapshot_cache import SnapshotCache
+from weather_schema import header_schema, parse_column, parse_measure
+from weather_store import EXTRA_MEASURES, MEASURES, WeatherReading, WeatherReadingStore
+
+
+# data structure describing one monthly data file
+ManifestEntry = namedtuple('ManifestEntry', ['station', 'year', 'month', 'path'])
 
 
 class WeatherDataParser:
-    ''' Parser class which populates the data rows '''
+    ''' Parser class which populates the data rows
+
+    Files are discovered through a manifest built from their names, and are
+    only read once a query asks for the year or month they hold. Readings
+    are kept in one WeatherReadingStore per station, so files of different
+    stations are never mixed.
 
-    def __init__(self, folder_path: str):
+    The folder may also be a zip or tar archive, and files may be gzip, bz2
+    or xz compressed; they are decompressed as they are read, never to disk.
+    '''
+
+    def __init__(self, folder_path: str, jobs: int = 1, cache_path: str = None):
         ''' Initialize the WeatherDataParser
 
         Args:
-            folder_path (str): The folder path
+            folder_path (str): The folder path, or the path of an archive
+            jobs (int): The number of processes used to parse files
+            cache_path (str): Optional path of a snapshot of parsed files
 
             '''
-        self.weather_readings = []
+        self.cache = SnapshotCache(cache_path) if cache_path else None
+        self.weather_readings = {}
         self.folder_path = folder_path
+        self.source = open_data_source(folder_path)
+        self.jobs = jobs
+        self.manifest = None
+        # path of each loaded file to its ManifestEntry and file_stat
+        self.loaded_files = {}
+
+    def parse_date(self, value: str):
+        ''' Parse a date into its ordinal
+
+        Args:
+            value (str): The date in the format "YYYY-M-D"
+        Returns:
+            int: The proleptic Gregorian ordinal of the date
+        '''
+        year, month, day = value.split('-')
+        return date(int(year), int(month), int(day)).toordinal()
+
+    def build_manifest(self):
+        ''' List the data files, reading only their names
+
+        Files whose names, less any compression suffix, do not follow
+        WEATHER_FILE_PATTERN are skipped. Snapshot entries of files no
+        longer listed are dropped.
+
+        Returns:
+            list: The ManifestEntry objects sorted by station, year and month
+        '''
+        pattern = re.compile(WEATHER_FILE_PATTERN)
+        months = {abbr: number for number, abbr in enumerate(month_abbr) if abbr}
+        manifest = []
+        for file, path in self.source.list_files():
+            match = pattern.match(file)
+            if match and match.group('month') in months:
+                manifest.append(ManifestEntry(
+                    match.group('station'),
+                    int(match.group('year')),
+                    months[match.group('month')],
+                    path
+                ))
+        manifest.sort()
+        if self.cache is not None:
+            self.cache.prune(self.folder_path, [entry.path for entry in manifest])
+        return manifest
+
+    def select_files(self, year: int = None, month: int = None, station: str = None):
+        ''' Prune the manifest to the files holding a year or month
+
+        Args:
+            year (int): The year, or None for every year
+            month (int): The month, or None for every month
+            station (str): The station, or None for every station
+        Returns:
+            list: The matching ManifestEntry objects
+        '''
+        if self.manifest is None:
+            self.manifest = self.build_manifest()
+        return [entry for entry in self.manifest
+                if (year is None or entry.year == year)
+                and (month is None or entry.month == month)
+                and (station is None or entry.station == station)]
+
+    def stations(self):
+        ''' List the stations found in the file names
+
+        Returns:
+            list: The station names, sorted
+        '''
+        return sorted({entry.station for entry in self.select_files()})
+
+    def parse_lines(self, lines, measures=MEASURES, raw_measures=()):
+        ''' Parse the lines of one data file, starting with its header
+
+        The header is mapped to a WeatherSchema, and only the fields of the
+        requested measures are picked out of each line. Lines are parsed
+        one at a time, so this suits streaming; parse_partition converts a
+        whole file faster.
+
+        Args:
+            lines (iterable): The lines of the file
+            measures (tuple): The measures converted to floats
+            raw_measures (tuple): The measures whose field text is kept as is
+        Yields:
+            tuple: The date ordinal, the values of measures and the field
+                texts of raw_measures
+        '''
+        lines = iter(lines)
+        schema = header_schema(next(lines, ''))
+        positions = schema.project(measures)
+        raw_positions = schema.project(raw_measures)
+        for line in lines:
+            entry = line.strip().split(',')
+            if not entry[DATE_INDEX]:
+                continue
+            if len(entry) < schema.width:
+                entry.extend([''] * (schema.width - len(entry)))
+            # missing columns point at this empty field
+            entry.append('')
+            yield (self.parse_date(entry[DATE_INDEX]),
+                   tuple(parse_measure(entry[position]) for position in positions),
+                   tuple(entry[position] for position in raw_positions))
+
+    def parse_file(self, path: str):
+        ''' Parse one data file into a store of its own
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            WeatherReadingStore: The readings of that file, in file order
+        '''
+        # the file is read whole so file I/O and parsing are timed apart
+        with profiler.stage('ingest.read_file'):
+            with self.source.open(path) as f:
+                lines = f.readlines()
+        return self.parse_partition(lines)
 
-    def parse_float(self, value):
-        ''' Parse a float value
+    def parse_partition(self, lines):
+        ''' Parse the lines of one data file into a store of its own
+
+        The lines are split into fields and transposed, so each measure is
+        converted as one block of fields into its column instead of value
+        by value, row by row.
 
         Args:
-            value (str): The value to parse
+            lines (list): The lines of the file, starting with its header
         Returns:
-            float: The parsed float value
+            WeatherReadingStore: The readings of that file, in file order
         '''
-        try:
-            return float(value)
-        except ValueError:
-            return float('nan')
+        with profiler.stage('ingest.parse_rows'):
+            lines = iter(lines)
+            schema = header_schema(next(lines, ''))
+            padding = [''] * schema.width
+            rows = [entry if len(entry) >= schema.width else entry + padding[len(entry):]
+                    for entry in (line.strip().split(',') for line in lines) if entry[DATE_INDEX]]
+            fields = list(zip(*rows)) if rows else [()] * schema.width
+
+            # missing columns read as missing values
+            missing = array('d', [float('nan')]) * len(rows)
+            dates = array('l', map(self.parse_date, fields[DATE_INDEX]))
+            columns = {measure: parse_column(fields[position]) if position >= 0 else array('d', missing)
+                       for measure, position in zip(MEASURES, schema.project(MEASURES))}
+            raw_columns = {measure: list(fields[position]) if position >= 0 else [''] * len(rows)
+                           for measure, position in zip(EXTRA_MEASURES, schema.project(EXTRA_MEASURES))}
+        return WeatherReadingStore(dates, columns, raw_columns)
+
+    @profiled('ingest')
+    def parse_files(self, paths: list):
+        ''' Parse data files, across a process pool when jobs > 1
 
-    def populate_data(self):
-        ''' Populate the data from the files
+        Files of an archive that can only be read front to back are
+        decompressed here in one pass, and only their parsing is spread
+        across the workers. Workers are forked where that is possible, and
+        forking while other threads run can deadlock the workers on a lock
+        one of those threads held, e.g. in logging or the profiler, so a
+        process running threads, like the app with its reloader, parses
+        in this process instead.
 
+        Args:
+            paths (list): The paths of the data files
         Returns:
-            list: The list of WeatherReading objects
+            list: One WeatherReadingStore per path, in the order of paths
+        '''
+        if self.source.sequential:
+            with profiler.stage('ingest.read_file'):
+                texts = {path: f.read() for path, f in self.source.read_files(paths)}
+        methods = multiprocessing.get_all_start_methods()
+        forks_threads = 'fork' in methods and threading.active_count() > 1
+        if self.jobs <= 1 or len(paths) <= 1 or forks_threads:
+            if self.source.sequential:
+                partitions = [self.parse_partition(texts[path].splitlines()) for path in paths]
+            else:
+                partitions = list(map(self.parse_file, paths))
+        else:
+            # fork keeps workers from re-importing the main module (app.py)
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            chunksize = max(1, len(paths) // (self.jobs * 4))
+            with ProcessPoolExecutor(max_workers=self.jobs, mp_context=context) as executor:
+                if self.source.sequential:
+                    partitions = list(executor.map(parse_text_in_worker, repeat(self.folder_path),
+                                                   [texts[path] for path in paths], chunksize=chunksize))
+                else:
+                    partitions = list(executor.map(parse_file_in_worker, repeat(self.folder_path), paths,
+                                                   chunksize=chunksize))
+
+        # counted here, as workers profile into their own copy of the profiler
+        profiler.count('files_read', len(paths))
+        profiler.count('rows_parsed', sum(map(len, partitions)))
+        return partitions
 
+    def stream_readings(self, year: int = None, month: int = None, station: str = None):
+        ''' Stream readings file by file without keeping them in the store
+
+        Only one line of one file is held at a time, so memory stays constant
+        however large the archive is. Files of a tar archive come in the
+        order they are stored in.
+
+        Args:
+            year (int): The year, or None for every year
+            month (int): The month, or None for every month
+            station (str): The station, or None for every station
+        Yields:
+            WeatherReading: The readings in manifest order, station by station
         '''
-        # get list of files in the folder
-        files = os.listdir(self.folder_path)
-        for file in files:
-            with open(os.path.join(self.folder_path, file), "r") as f:
-                for line in f.readlines()[1:]:
-                    entry = line.strip().split(',')
-                    if entry:
-                        # create a WeatherReading object and append to list
-                        self.weather_readings.append(WeatherReading(
-                            entry[DATE_INDEX],
-                            self.parse_float(entry[MAX_TEMP_INDEX]),
-                            self.parse_float(entry[MEAN_TEMP_INDEX]),
-                            self.parse_float(entry[MIN_TEMP_INDEX]),
-                            self.parse_float(entry[MAX_HUMIDITY_INDEX+3]),
-                            self.parse_float(entry[MEAN_HUMIDITY_INDEX+3]),
-                            self.parse_float(entry[MIN_HUMIDITY_INDEX+3])
-                        ))
+        paths = [entry.path for entry in self.select_files(year, month, station)]
+        for _, f in self.source.read_files(paths):
+            for date_ordinal, values, _ in self.parse_lines(f):
+                day = date.fromordinal(date_ordinal)
+                yield WeatherReading(f"{day.year}-{day.month}-{day.day}", *values)
 
+    def stream_batches(self, year: int = None, month: int = None, station: str = None,
+                       batch_size: int = STREAM_BATCH_SIZE):
+        ''' Stream readings in fixed-size batches
+
+        Args:
+            year (int): The year, or None for every year
+            month (int): The month, or None for every month
+            station (str): The station, or None for every station
+            batch_size (int): The number of readings per batch
+        Yields:
+            list: Up to batch_size WeatherReading objects
+        '''
+        readings = self.stream_readings(year, month, station)
+        while True:
+            batch = list(islice(readings, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @profiled('ingest')
+    def load_partitions(self, paths: list):
+        ''' Load data files, reusing the snapshot for files that are unchanged
+
+        Args:
+            paths (list): The paths of the data files
+        Returns:
+            list: One WeatherReadingStore per path, in the order of paths
+        '''
+        if self.cache is None:
+            return self.parse_files(paths)
+
+        with profiler.stage('ingest.snapshot_read'):
+            partitions = {path: self.cache.get(path, self.file_stat(path)) for path in paths}
+        stale = [path for path, partition in partitions.items() if partition is None]
+        for path, partition in zip(stale, self.parse_files(stale)):
+            self.cache.put(path, self.file_stat(path), partition)
+            partitions[path] = partition
+        with profiler.stage('ingest.snapshot_write'):
+            self.cache.save()
+        return [partitions[path] for path in paths]
+
+    def file_stat(self, path: str):
+        ''' Identify the version of a data file on disk
+
+        Args:
+            path (str): The path of the data file
+        Returns:
+            tuple: The size and modification time in nanoseconds, or for
+                an archive member whatever identifies its version
+        '''
+        return self.source.stat(path)
+
+    @profiled('ingest')
+    def populate_data(self, year: int = None, month: int = None, station: str = None):
+        ''' Populate the data from the files holding a year or month
+
+        Files loaded by earlier calls are not read again, so this can be
+        called before every query to load partitions on demand.
+
+        Args:
+            year (int): The year, or None for every year
+            month (int): The month, or None for every month
+            station (str): The station, or None for every station
+        Returns:
+            dict: Station name to its WeatherReadingStore, sorted by date
+
+        '''
+        entries = [entry for entry in self.select_files(year, month, station)
+                   if entry.path not in self.loaded_files]
+        if not entries:
+            return self.weather_readings
+
+        # partitions come back in manifest order and the sort below is
+        # stable, so the merged stores do not depend on worker scheduling
+        changed_months = {}
+        pending = [entry.path for entry in entries]
+        for entry, partition in zip(entries, self.load_partitions(pending)):
+            store = self.weather_readings.setdefault(entry.station, WeatherReadingStore())
+            store.extend(partition)
+            changed_months.setdefault(entry.station, set()).add((entry.year, entry.month))
+            self.loaded_files[entry.path] = (entry, self.file_stat(entry.path))
+
+        with profiler.stage('ingest.sort_and_index'):
+            for station, months in changed_months.items():
+                self.weather_readings[station].sort_by_date()
+                self.weather_readings[station].build_index(months)
         return self.weather_readings
+
+    @profiled('ingest')
+    def refresh(self):
+        ''' Pick up data files added, changed or removed since they were loaded
+
+        The stations whose files changed are rebuilt into new stores and a
+        new station mapping then replaces weather_readings, so stores already
+        handed out are never modified. The parser is only updated once every
+        file has been read, so a refresh that fails, e.g. on a file caught
+        half-written, leaves it as it was and the next refresh starts over.
+
+        Returns:
+            bool: Whether anything changed
+        '''
+        manifest = self.build_manifest()
+        current = {entry.path: entry for entry in manifest}
+
+        removed = [path for path in self.loaded_files if path not in current]
+        stats = {path: self.file_stat(path) for path in current}
+        pending = [path for path in current
+                   if self.loaded_files.get(path, (None, None))[1] != stats[path]]
+        if not removed and not pending:
+            self.manifest = manifest
+            return False
+
+        # drop the months held by removed or rewritten files, then re-add
+        stale_months = {}
+        for path in removed + pending:
+            if path in self.loaded_files:
+                entry = self.loaded_files[path][0]
+                stale_months.setdefault(entry.station, set()).add((entry.year, entry.month))
+        changed_months = {station: set(months) for station, months in stale_months.items()}
+        for path in pending:
+            entry = current[path]
+            changed_months.setdefault(entry.station, set()).add((entry.year, entry.month))
+
+        weather_readings = dict(self.weather_readings)
+        for station in changed_months:
+            store = weather_readings.get(station, WeatherReadingStore())
+            weather_readings[station] = store.without_months(stale_months.get(station, set()))
+        for path, partition in zip(pending, self.load_partitions(pending)):
+            weather_readings[current[path].station].extend(partition)
+
+        for station, months in changed_months.items():
+            store = weather_readings[station]
+            if not len(store):
+                del weather_readings[station]
+                continue
+            store.sort_by_date()
+            store.build_index(months)
+
+        for path in pending:
+            self.loaded_files[path] = (current[path], stats[path])
+        for path in removed:
+            del self.loaded_files[path]
+        self.manifest = manifest
+        self.weather_readings = weather_readings
+        return True
+
+
+# parser of each data folder, kept for the life of a worker process
+worker_parsers = {}
+
+
+def worker_parser(folder_path: str):
+    ''' Get the parser a worker reads a data folder with
+
+    A fresh parser is used so the store already loaded by the calling parser
+    is never pickled across to the worker, and it is kept so an archive is
+    opened once per worker rather than once per file.
+
+    Args:
+        folder_path (str): The folder path, or the path of an archive
+    Returns:
+        WeatherDataParser: The parser
+    '''
+    parser = worker_parsers.get(folder_path)
+    if parser is None:
+        parser = worker_parsers[folder_path] = WeatherDataParser(folder_path)
+    return parser
+
+
+def parse_file_in_worker(folder_path: str, path: str):
+    ''' Parse one data file inside a process pool worker
+
+    Args:
+        folder_path (str): The folder path, or the path of an archive
+        path (str): The path of the data file
+    Returns:
+        WeatherReadingStore: The readings of that file, in file order
+    '''
+    return worker_parser(folder_path).parse_file(path)
+
+
+def parse_text_in_worker(folder_path: str, text: str):
+    ''' Parse the text of one data file inside a process pool worker
+
+    Args:
+        folder_path (str): The folder path, or the path of an archive
+        text (str): The whole text of the data file
+    Returns:
+        WeatherReadingStore: The readings of that file, in file order
+    '''
+    return worker_parser(folder_path).parse_partition(text.splitlines())
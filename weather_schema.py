@@ -0,0 +1,123 @@
+import re
+from array import array
+
+# data file column name, lowercased with everything but letters removed, to
+# the measure it holds; the first column always holds the date
+HEADER_MEASURES = {
+    'maxtemperaturec': 'max_temp',
+    'meantemperaturec': 'mean_temp',
+    'mintemperaturec': 'min_temp',
+    'dewpointc': 'max_dew_point',
+    'meandewpointc': 'mean_dew_point',
+    'mindewpointc': 'min_dew_point',
+    'maxhumidity': 'max_humidity',
+    'meanhumidity': 'mean_humidity',
+    'minhumidity': 'min_humidity',
+    'maxsealevelpressurehpa': 'max_pressure',
+    'meansealevelpressurehpa': 'mean_pressure',
+    'minsealevelpressurehpa': 'min_pressure',
+    'maxvisibilitykm': 'max_visibility',
+    'meanvisibilitykm': 'mean_visibility',
+    'minvisibilitykm': 'min_visibility',
+    'maxwindspeedkmh': 'max_wind_speed',
+    'meanwindspeedkmh': 'mean_wind_speed',
+    'maxgustspeedkmh': 'max_gust_speed',
+    'precipitationmm': 'precipitation',
+    'cloudcover': 'cloud_cover',
+    'winddirdegrees': 'wind_direction',
+}
+
+
+# header line to its WeatherSchema, shared by every file with that layout
+SCHEMA_CACHE = {}
+
+
+def parse_measure(value: str):
+    ''' Parse the text of a measure, with NaN for a missing value
+
+    Args:
+        value (str): The field text
+    Returns:
+        float: The parsed float value
+    '''
+    try:
+        return float(value)
+    except ValueError:
+        return float('nan')
+
+
+def parse_column(values):
+    ''' Parse the texts of a whole column of a measure at once
+
+    Empty fields, the usual way a value is missing, become NaN without
+    raising; only a column holding some other text that is not a number
+    falls back to parse_measure field by field.
+
+    Args:
+        values (iterable): The field texts
+    Returns:
+        array: The float64 values, NaN where missing
+    '''
+    nan = float('nan')
+    try:
+        return array('d', [float(value) if value else nan for value in values])
+    except ValueError:
+        return array('d', map(parse_measure, values))
+
+
+def header_schema(header: str):
+    ''' Get the schema of a header layout, mapping each layout only once
+
+    Args:
+        header (str): The header line
+    Returns:
+        WeatherSchema: The schema, shared by every file with this header
+    '''
+    schema = SCHEMA_CACHE.get(header)
+    if schema is None:
+        schema = SCHEMA_CACHE[header] = WeatherSchema(header)
+    return schema
+
+
+class WeatherSchema:
+    ''' Positions of the measures in a data file, read from its header
+
+    Columns are matched by name, so files whose columns are reordered or
+    missing are read correctly; a measure without a column reads as missing.
+
+    Attributes:
+        positions (dict): Measure name to its field position
+        width (int): The number of fields in the header
+        projections (dict): The measures of each project() call to its result
+    '''
+
+    def __init__(self, header: str):
+        ''' Map the header of a data file
+
+        Args:
+            header (str): The header line
+        '''
+        names = header.strip().split(',')
+        self.width = len(names)
+        self.positions = {}
+        self.projections = {}
+        for position, name in enumerate(names[1:], start=1):
+            measure = HEADER_MEASURES.get(re.sub(r'[^a-z]', '', name.lower()))
+            if measure is not None:
+                self.positions.setdefault(measure, position)
+
+    def project(self, measures):
+        ''' Find the field positions of some measures
+
+        Args:
+            measures (iterable): The measure names
+        Returns:
+            tuple: One position per measure; -1 for a measure the file lacks,
+                which parse_lines points at an empty field
+        '''
+        measures = tuple(measures)
+        positions = self.projections.get(measures)
+        if positions is None:
+            positions = self.projections[measures] = tuple(
+                self.positions.get(measure, -1) for measure in measures)
+        return positions
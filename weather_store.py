@@ -0,0 +1,329 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import date
+from itertools import filterfalse
+from math import fsum, isnan
+from climatology import ClimatologyTable
+from range_query import RangeQueryEngine
+from rollups import RollupTable
+from weather_schema import parse_column, parse_measure
+
+# data structure to hold weather readings for a given day
+WeatherReading = namedtuple('WeatherReading', [
+    'date', 'max_temp', 'mean_temp', 'min_temp', 'max_humidity', 'mean_humidity', 'min_humidity'
+])
+
+# measures stored as float64 columns, in WeatherReading order
+MEASURES = WeatherReading._fields[1:]
+
+# measures kept as field text and only converted once a query uses them
+EXTRA_MEASURES = (
+    'max_dew_point', 'mean_dew_point', 'min_dew_point',
+    'max_pressure', 'mean_pressure', 'min_pressure',
+    'max_visibility', 'mean_visibility', 'min_visibility',
+    'max_wind_speed', 'mean_wind_speed', 'max_gust_speed',
+    'precipitation', 'cloud_cover', 'wind_direction',
+)
+
+
+class WeatherReadingStore:
+    ''' Columnar store of daily weather readings
+
+    Dates are kept as proleptic Gregorian ordinals in a contiguous array of
+    integers and every measure as a contiguous float64 array, with NaN for
+    missing values. Rows are kept sorted by date so that any year or month
+    is a contiguous slice of every column.
+
+    The EXTRA_MEASURES are kept as the text of their fields until a query
+    first reads them through column(), so reports on the MEASURES never pay
+    for converting them.
+
+    Attributes:
+        dates (array): The date ordinals
+        columns (dict): Measure name to float64 array, for every converted measure
+        raw_columns (dict): Measure name to the list of its field texts, for
+            the extra measures not converted yet
+        month_index (dict): (year, month) to the slice of rows in that month
+        year_index (dict): Year to the slice of rows in that year
+        rollups (RollupTable): Monthly and yearly summaries of every measure
+        climatology (ClimatologyTable): Day-of-year normals of every measure
+        range_queries (RangeQueryEngine): Date-range queries, built on first use
+    '''
+
+    def __init__(self, dates=None, columns=None, raw_columns=None):
+        ''' Initialize the store
+
+        Args:
+            dates (array): The date ordinals
+            columns (dict): Measure name to float64 array
+            raw_columns (dict): Measure name to the list of its field texts
+        '''
+        self.dates = dates if dates is not None else array('l')
+        self.columns = columns if columns is not None else {
+            measure: array('d') for measure in MEASURES}
+        self.raw_columns = raw_columns if raw_columns is not None else {
+            measure: [] for measure in EXTRA_MEASURES}
+        self.month_index = {}
+        self.year_index = {}
+        self.rollups = RollupTable()
+        self.climatology = ClimatologyTable()
+        self.range_queries = None
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, row: int):
+        ''' Build a WeatherReading for a single row
+
+        Args:
+            row (int): The row position
+        Returns:
+            WeatherReading: The reading stored at that row
+        '''
+        return WeatherReading(self.date_string(row),
+                              *(self.columns[measure][row] for measure in MEASURES))
+
+    def __iter__(self):
+        return (self[row] for row in range(len(self)))
+
+    def append(self, date_ordinal: int, values, raw_values=()):
+        ''' Append a single day to the store
+
+        Args:
+            date_ordinal (int): The date ordinal
+            values (iterable): The measures in MEASURES order
+            raw_values (iterable): The field texts in EXTRA_MEASURES order
+        '''
+        self.dates.append(date_ordinal)
+        for measure, value in zip(MEASURES, values):
+            self.columns[measure].append(value)
+        for measure, value in zip(EXTRA_MEASURES, raw_values):
+            if measure in self.raw_columns:
+                self.raw_columns[measure].append(value)
+            else:
+                self.columns[measure].append(parse_measure(value))
+
+    def column(self, measure: str):
+        ''' Get the float64 column of a measure, converting it on first use
+
+        Args:
+            measure (str): The measure name
+        Returns:
+            array: The values of every row, NaN where missing
+        '''
+        column = self.columns.get(measure)
+        if column is None:
+            raw_column = self.raw_columns.get(measure)
+            if raw_column is None:
+                # converted meanwhile by another thread
+                return self.columns[measure]
+            column = parse_column(raw_column)
+            self.columns[measure] = column
+            self.raw_columns.pop(measure, None)
+        return column
+
+    def extend(self, other):
+        ''' Append every row of another store
+
+        A measure still unconverted in both stores stays unconverted.
+
+        Args:
+            other (WeatherReadingStore): The store to copy rows from
+        '''
+        for measure in list(self.raw_columns):
+            if measure in other.raw_columns:
+                self.raw_columns[measure].extend(other.raw_columns[measure])
+            else:
+                self.column(measure)
+        self.dates.extend(other.dates)
+        for measure, column in self.columns.items():
+            column.extend(other.column(measure))
+
+    def without_months(self, months):
+        ''' Copy the store, leaving out some months
+
+        Args:
+            months (set): The (year, month) pairs to leave out
+        Returns:
+            WeatherReadingStore: A new, unindexed store with the other rows
+                and their summaries
+        '''
+        kept = [rows for year_month, rows in sorted(self.month_index.items())
+                if year_month not in months]
+        store = WeatherReadingStore(array('l'), {measure: array('d') for measure in self.columns},
+                                    {measure: [] for measure in self.raw_columns})
+        store.rollups = self.rollups.without_months(months)
+        store.climatology = self.climatology.copy()
+        store.climatology.invalidate(months)
+        for rows in kept:
+            store.dates.extend(self.dates[rows])
+            for measure, column in store.columns.items():
+                column.extend(self.columns[measure][rows])
+            for measure, raw_column in store.raw_columns.items():
+                raw_column.extend(self.raw_columns[measure][rows])
+        return store
+
+    def sort_by_date(self):
+        ''' Reorder every column by date, keeping the input order for ties '''
+        order = sorted(range(len(self.dates)), key=self.dates.__getitem__)
+        self.dates = array('l', map(self.dates.__getitem__, order))
+        for measure, column in self.columns.items():
+            self.columns[measure] = array('d', map(column.__getitem__, order))
+        for measure, raw_column in self.raw_columns.items():
+            self.raw_columns[measure] = list(map(raw_column.__getitem__, order))
+
+    def build_index(self, changed_months=()):
+        ''' Build the (year, month) partition index over the sorted rows
+
+        Each month is located with a binary search on its first day, so the
+        index costs O(months * log(rows)) and never touches a date string.
+        Summaries are then computed for months that are new or changed, and
+        the normals of their calendar months are dropped until next used.
+
+        Args:
+            changed_months (iterable): (year, month) pairs whose rows changed
+        '''
+        self.month_index = {}
+        self.year_index = {}
+        self.range_queries = None
+        if self.dates:
+            self.index_months()
+        changed_months = set(changed_months) | (self.month_index.keys() ^ self.rollups.months.keys())
+        self.rollups.update(self, changed_months, MEASURES)
+        self.climatology.invalidate(changed_months)
+
+    def index_months(self):
+        ''' Locate every month of the sorted rows '''
+        first = date.fromordinal(self.dates[0])
+        last = date.fromordinal(self.dates[-1])
+        year, month = first.year, first.month
+        start = 0
+        while (year, month) <= (last.year, last.month):
+            next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+            stop = bisect_left(self.dates, date(next_year, next_month, 1).toordinal(), start)
+            if stop > start:
+                self.month_index[(year, month)] = slice(start, stop)
+                year_start = self.year_index.get(year, slice(start, stop)).start
+                self.year_index[year] = slice(year_start, stop)
+            year, month, start = next_year, next_month, stop
+
+    def range_engine(self):
+        ''' Get the date-range query engine over the sorted rows
+
+        Returns:
+            RangeQueryEngine: The engine, created on first use after indexing
+        '''
+        if self.range_queries is None:
+            self.range_queries = RangeQueryEngine(self)
+        return self.range_queries
+
+    def normals(self, month: int):
+        ''' Get the day-of-year normals of a calendar month over every loaded year
+
+        Args:
+            month (int): The calendar month
+        Returns:
+            dict: Day of the month to {measure: Normal}
+        '''
+        return self.climatology.normals_for(self, month, MEASURES)
+
+    def rows_for(self, year: int, month: int = None):
+        ''' Look up the rows of a year or month in the partition index
+
+        Args:
+            year (int): The year
+            month (int): The month, or None for the whole year
+        Returns:
+            slice: The contiguous rows, empty if there is no data
+        '''
+        if month is None:
+            return self.year_index.get(year, slice(0, 0))
+        return self.month_index.get((year, month), slice(0, 0))
+
+    def date_string(self, row: int):
+        ''' Format the date of a row as it appears in the data files
+
+        Args:
+            row (int): The row position
+        Returns:
+            str: The date in the format "YYYY-M-D"
+        '''
+        return self.ordinal_string(self.dates[row])
+
+    @staticmethod
+    def ordinal_string(date_ordinal: int):
+        ''' Format a date ordinal as it appears in the data files
+
+        Args:
+            date_ordinal (int): The date ordinal
+        Returns:
+            str: The date in the format "YYYY-M-D"
+        '''
+        day = date.fromordinal(date_ordinal)
+        return f"{day.year}-{day.month}-{day.day}"
+
+    def rows_between(self, first: date, last: date):
+        ''' Find the rows dated within [first, last]
+
+        Args:
+            first (date): The first date, inclusive
+            last (date): The last date, inclusive
+        Returns:
+            slice: The contiguous rows in that window
+        '''
+        return slice(bisect_left(self.dates, first.toordinal()),
+                     bisect_right(self.dates, last.toordinal()))
+
+    def nan_max(self, measure: str, rows: slice):
+        ''' Find the largest non-missing value of a measure
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to reduce
+        Returns:
+            tuple: The value and its row, or (nan, None) if all are missing
+        '''
+        values = self.column(measure)[rows]
+        value = max(filterfalse(isnan, values), default=float('nan'))
+        if isnan(value):
+            return value, None
+        return value, rows.start + values.index(value)
+
+    def nan_min(self, measure: str, rows: slice):
+        ''' Find the smallest non-missing value of a measure
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to reduce
+        Returns:
+            tuple: The value and its row, or (nan, None) if all are missing
+        '''
+        values = self.column(measure)[rows]
+        value = min(filterfalse(isnan, values), default=float('nan'))
+        if isnan(value):
+            return value, None
+        return value, rows.start + values.index(value)
+
+    def nan_values(self, measure: str, rows: slice):
+        ''' List the non-missing values of a measure
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to read
+        Returns:
+            list: The values in date order
+        '''
+        return list(filterfalse(isnan, self.column(measure)[rows]))
+
+    def nan_sum_count(self, measure: str, rows: slice):
+        ''' Sum and count the non-missing values of a measure
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to reduce
+        Returns:
+            tuple: The sum and the number of values
+        '''
+        values = self.nan_values(measure, rows)
+        return fsum(values), len(values)
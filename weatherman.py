@@ -1,14 +1,53 @@
 import sys
-from cmd_parser import create_parser
+import time
+from actions import ReportSession
+from cmd_parser import create_parser, create_serve_parser
+from daemon import request_reports, serve
+from profiling import profiler
 
 
 def main():
+    if sys.argv[1:2] == ["serve"]:
+        args = create_serve_parser().parse_args(sys.argv[2:])
+        serve(args.socket, args.data_dir, jobs=args.jobs, cache_path=args.cache)
+        return
+
     parser = create_parser()
     if len(sys.argv) == 1:
         parser.print_help()
         sys.exit(1)
 
-    parser.parse_args()
+    args = parser.parse_args()
+    if (args.date_from is None) != (args.date_to is None):
+        parser.error("--from and --to must be given together")
+    if args.date_from is not None:
+        if args.date_from > args.date_to:
+            parser.error("--from must not be after --to")
+        args.queries.append(('date_range', (args.date_from, args.date_to)))
+
+    # a running daemon already holds the data; streaming and profiling
+    # are about this process, so they always run here
+    if args.queries and not (args.no_daemon or args.stream or args.profile):
+        response = request_reports(args.socket, args.data_dir, args.queries,
+                                   station=args.station, chart_format=args.chart_format)
+        if response is not None:
+            print(response['output'], end="")
+            sys.exit(1 if response['failed'] else 0)
+
+    profiler.enabled = args.profile
+    start = time.perf_counter()
+
+    # every queued report shares one load of the data
+    session = ReportSession(args.data_dir, jobs=args.jobs,
+                            cache_path=args.cache, stream=args.stream,
+                            station=args.station, chart_format=args.chart_format)
+    session.run(args.queries)
+
+    if args.profile:
+        print(f"Profile ({(time.perf_counter() - start) * 1000:.2f} ms in total)", file=sys.stderr)
+        print(profiler.breakdown(), file=sys.stderr)
+    if session.failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,120 @@
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from math import isnan, sqrt
+
+# a day far from the trailing window before it; dates are "YYYY-M-D"
+Anomaly = namedtuple('Anomaly', ['date', 'measure', 'value', 'window_mean', 'window_std', 'deviations'])
+
+
+class WindowStatistics:
+    ''' Trailing-window statistics over the sorted rows of a store
+
+    Windows span calendar days, not rows, so gaps in the data shrink a
+    window instead of stretching it back in time. Each window is kept as a
+    running sum, sum of squares and count of its non-missing values: a day
+    entering the window is added and a day leaving it is subtracted, so a
+    whole series costs O(rows + days) whatever the window length.
+
+    Attributes:
+        store (WeatherReadingStore): The indexed store of one station
+    '''
+
+    def __init__(self, store):
+        ''' Initialize the statistics
+
+        Args:
+            store (WeatherReadingStore): The indexed store of one station
+        '''
+        self.store = store
+
+    def trailing(self, measure: str, rows: slice, days: int, include_current: bool = True):
+        ''' Compute the mean and standard deviation of the window ending at each row
+
+        Rows before rows.start are read as needed, so the first windows are
+        as full as the data allows.
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to compute windows for
+            days (int): The window length in days
+            include_current (bool): Whether a row's own day is in its window,
+                or the window is the days just before it
+        Returns:
+            tuple: Arrays of the means, standard deviations and value counts,
+                one entry per row; NaN where a window has no values
+        '''
+        dates = self.store.dates
+        values = self.store.column(measure)
+        means, stds, counts = array('d'), array('d'), array('l')
+        if rows.start >= rows.stop:
+            return means, stds, counts
+
+        # the window of a row on day d covers the days (first, last]
+        offset = 0 if include_current else 1
+        head = tail = bisect_left(dates, dates[rows.start] - days + 1 - offset)
+        total = squares = 0.0
+        count = 0
+        for row in range(rows.start, rows.stop):
+            last = dates[row] - offset
+            while head < len(dates) and dates[head] <= last:
+                value = values[head]
+                if not isnan(value):
+                    total += value
+                    squares += value * value
+                    count += 1
+                head += 1
+            while dates[tail] <= last - days:
+                value = values[tail]
+                if not isnan(value):
+                    total -= value
+                    squares -= value * value
+                    count -= 1
+                tail += 1
+
+            if count:
+                mean = total / count
+                means.append(mean)
+                stds.append(sqrt(max(squares / count - mean * mean, 0.0)))
+            else:
+                means.append(float('nan'))
+                stds.append(float('nan'))
+            counts.append(count)
+        return means, stds, counts
+
+    def moving_averages(self, measure: str, rows: slice, days: int):
+        ''' Average each row's day with the days before it
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to average
+            days (int): The window length in days
+        Returns:
+            array: The moving average at each row, NaN where there are no values
+        '''
+        return self.trailing(measure, rows, days)[0]
+
+    def anomalies(self, measure: str, rows: slice, days: int, threshold: float, min_count: int = 2):
+        ''' Find the days more than threshold standard deviations from the days before them
+
+        Args:
+            measure (str): The measure name
+            rows (slice): The rows to check
+            days (int): The length in days of the window before each day
+            threshold (float): The number of standard deviations, k
+            min_count (int): The fewest values a window needs to judge a day
+        Returns:
+            list: The Anomaly of each flagged day, in date order
+        '''
+        values = self.store.column(measure)
+        means, stds, counts = self.trailing(measure, rows, days, include_current=False)
+        flagged = []
+        for position, row in enumerate(range(rows.start, rows.stop)):
+            value, mean, std = values[row], means[position], stds[position]
+            if isnan(value) or counts[position] < min_count or not std > 0:
+                continue
+            deviations = (value - mean) / std
+            if abs(deviations) > threshold:
+                flagged.append(Anomaly(self.store.date_string(row), measure, value,
+                                       round(mean, 2), round(std, 2), round(deviations, 2)))
+        return flagged